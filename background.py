@@ -12,8 +12,10 @@ from __future__ import annotations
 import asyncio
 import mimetypes
 import time
-from collections import deque
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
@@ -22,6 +24,33 @@ if TYPE_CHECKING:
     from processor import CommandProcessor
 
 
+@lru_cache(maxsize=256)
+def _mime_for(ext: str) -> str | None:
+    """按扩展名缓存 MIME 类型 (ext 为小写的末尾两段后缀，如 ".tar.gz")"""
+    return mimetypes.guess_type("x" + ext)[0]
+
+
+@dataclass(slots=True)
+class StabilityState:
+    """稳定性状态 (心跳、重连、消息计数)"""
+
+    reconnect_attempts: int = 0
+    last_heartbeat: float = 0
+    last_message_time: float = 0
+    total_messages: int = 0
+    errors: deque[dict[str, str]] = field(default_factory=lambda: deque(maxlen=20))  # 仅保留最近 20 条
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为可序列化的字典"""
+        return {
+            "reconnect_attempts": self.reconnect_attempts,
+            "last_heartbeat": self.last_heartbeat,
+            "last_message_time": self.last_message_time,
+            "total_messages": self.total_messages,
+            "errors": list(self.errors),
+        }
+
+
 class BackgroundTasks:
     """后台任务管理器"""
 
@@ -30,7 +59,7 @@ class BackgroundTasks:
         bot: "WeChatHelperBot",
         processor: "CommandProcessor",
         download_dir: Path,
-        stability_state: dict[str, Any],
+        stability_state: StabilityState,
         *,
         auto_download: bool = True,
         file_date_subdir: bool = True,
@@ -52,6 +81,10 @@ class BackgroundTasks:
         self.max_reconnect_attempts = max_reconnect_attempts
         self.file_retention_days = file_retention_days
 
+        # 当日下载子目录缓存 (日期变化时重建并 mkdir)
+        self._date_dir_day = ""
+        self._date_dir: Path | None = None
+
         # 任务句柄
         self._listener_task: asyncio.Task | None = None
         self._session_saver_task: asyncio.Task | None = None
@@ -86,27 +119,31 @@ class BackgroundTasks:
     def _get_file_save_path(self, file_name: str) -> Path:
         """获取文件保存路径 (支持按日期分目录)"""
         if self.file_date_subdir:
-            date_dir = datetime.now().strftime("%Y-%m-%d")
-            target_dir = self.download_dir / date_dir
-            target_dir.mkdir(parents=True, exist_ok=True)
-            return target_dir / file_name
+            today = time.strftime("%Y-%m-%d")
+            if today != self._date_dir_day or self._date_dir is None:
+                target_dir = self.download_dir / today
+                target_dir.mkdir(parents=True, exist_ok=True)
+                self._date_dir_day = today
+                self._date_dir = target_dir
+            return self._date_dir / file_name
         return self.download_dir / file_name
 
     def _add_error(self, error: str) -> None:
-        """记录错误 (保留最近20条)"""
-        self.stability_state["errors"].append({
+        """记录错误 (errors 为 deque(maxlen=20)，自动保留最近20条)"""
+        self.stability_state.errors.append({
             "time": datetime.now().isoformat(),
             "error": error,
         })
-        if len(self.stability_state["errors"]) > 20:
-            self.stability_state["errors"] = self.stability_state["errors"][-20:]
 
     async def _background_listener(self) -> None:
         """消息监听器 - 带自动重连和动态轮询间隔"""
-        # 使用 deque 替代 list，pop(0) 复杂度从 O(n) 变为 O(1)
-        processed_order: deque[str] = deque(maxlen=5000)
-        processed_set: set[str] = set()
-        sent_buffer: deque[str] = deque(maxlen=40)
+        # OrderedDict 同时承担成员判断与插入顺序，超限时 O(1) 弹出最老的键
+        processed: OrderedDict[str, None] = OrderedDict()
+        processed_max = 5000
+        sent_buffer: OrderedDict[str, None] = OrderedDict()
+        sent_max = 40
+        # 每轮复用的消息缓冲 (避免每次轮询分配新列表)
+        msg_buf: list[dict[str, Any]] = []
 
         # 动态轮询间隔
         poll_interval = 1.0
@@ -122,34 +159,40 @@ class BackgroundTasks:
                 if not self.bot.is_logged_in:
                     await self.bot.check_login_status(poll=True)
                     if self.bot.is_logged_in:
-                        self.stability_state["reconnect_attempts"] = 0
+                        self.stability_state.reconnect_attempts = 0
                         print("[Listener] Login restored")
 
                 if self.bot.is_logged_in:
-                    messages = await self.bot.get_latest_messages(limit=12)
+                    await self.bot.get_latest_messages_into(msg_buf, limit=12)
+                    msg_buf.reverse()
 
-                    for msg in reversed(messages):
+                    # 先整批筛出候选 (处理前才标记为已处理，中途异常时后续消息下轮重试)
+                    candidates: list[tuple[dict, str, str, str]] = []
+                    batch_keys: set[str] = set()
+                    for msg in msg_buf:
                         content = str(msg.get("text", "")).strip()
                         msg_id = str(msg.get("id", "")).strip()
                         unique_key = msg_id or content
 
-                        if not unique_key:
-                            continue
-                        if unique_key in processed_set:
+                        if not unique_key or unique_key in processed or unique_key in batch_keys:
                             continue
+                        batch_keys.add(unique_key)
+                        candidates.append((msg, msg_id, unique_key, content))
 
-                        processed_set.add(unique_key)
-                        processed_order.append(unique_key)
+                    for msg, msg_id, unique_key, content in candidates:
+                        processed[unique_key] = None
+                        if len(processed) > processed_max:
+                            processed.popitem(last=False)
 
                         if content and content in sent_buffer:
                             continue
-
+                        order_len = len(processed)
                         had_messages = True
 
                         # 自动下载文件
                         file_feedback = None
                         if self.auto_download and msg.get("type") in {"image", "file"}:
-                            file_feedback = await self._handle_file_download(msg, msg_id, unique_key, len(processed_order))
+                            file_feedback = await self._handle_file_download(msg, msg_id, unique_key, order_len)
 
                         # 处理消息
                         reply = await self.processor.process(msg)
@@ -163,14 +206,13 @@ class BackgroundTasks:
                         if reply:
                             ok = await self.bot.send_text(reply)
                             if ok:
-                                sent_buffer.append(reply)
-
-                        self.stability_state["last_message_time"] = time.time()
-                        self.stability_state["total_messages"] += 1
+                                sent_buffer[reply] = None
+                                sent_buffer.move_to_end(reply)
+                                if len(sent_buffer) > sent_max:
+                                    sent_buffer.popitem(last=False)
 
-                    # 同步清理 processed_set (deque 满时旧元素被移除)
-                    if len(processed_set) > len(processed_order) + 100:
-                        processed_set = set(processed_order)
+                        self.stability_state.last_message_time = time.time()
+                        self.stability_state.total_messages += 1
 
                 # 动态调整轮询间隔
                 if had_messages:
@@ -200,10 +242,16 @@ class BackgroundTasks:
         if success:
             # 更新消息中的文件路径
             msg["file_path"] = str(save_path)
-            msg["file_size"] = save_path.stat().st_size if save_path.exists() else 0
+            try:
+                # 放到线程池，避免网络存储上的 stat 阻塞事件循环
+                st = await asyncio.to_thread(save_path.stat)
+                msg["file_size"] = st.st_size
+            except OSError:
+                msg["file_size"] = 0
 
             # 保存文件元数据
-            mime_type, _ = mimetypes.guess_type(file_name)
+            # guess_type 会剥离 .gz/.bz2 等编码后缀，故以末尾两段后缀为键
+            mime_type = _mime_for("".join(Path(file_name).suffixes[-2:]).lower())
             self.processor.message_store.save_file(
                 msg_id=msg_id,
                 file_name=file_name,
@@ -219,12 +267,18 @@ class BackgroundTasks:
         return None
 
     async def _periodic_session_saver(self) -> None:
-        """定期保存会话"""
+        """定期保存会话 (状态无变更时跳过写入并拉长间隔)"""
+        busy_interval = 60
+        idle_interval = max(60, self.heartbeat_interval * 2)
+        interval = busy_interval
         while True:
-            await asyncio.sleep(60)
+            await asyncio.sleep(interval)
             try:
-                if self.bot.is_logged_in:
+                if self.bot.is_logged_in and self.bot.session_dirty:
                     await self.bot.save_session()
+                    interval = busy_interval
+                else:
+                    interval = idle_interval
             except Exception as exc:
                 print(f"[SessionSaver] Error: {exc}")
 
@@ -233,7 +287,7 @@ class BackgroundTasks:
         while True:
             await asyncio.sleep(self.heartbeat_interval)
             try:
-                self.stability_state["last_heartbeat"] = time.time()
+                self.stability_state.last_heartbeat = time.time()
 
                 if self.bot.is_logged_in:
                     # 检查连接状态
@@ -241,9 +295,10 @@ class BackgroundTasks:
                     if status == "loginout":
                         print("[Heartbeat] Detected logout, will reconnect")
                         self.bot.is_logged_in = False
-                        self.stability_state["reconnect_attempts"] += 1
+                        self.bot.invalidate_login_cache()
+                        self.stability_state.reconnect_attempts += 1
 
-                        if self.stability_state["reconnect_attempts"] <= self.max_reconnect_attempts:
+                        if self.stability_state.reconnect_attempts <= self.max_reconnect_attempts:
                             await asyncio.sleep(self.reconnect_delay)
                             # 尝试使用已保存的会话重新登录
                             await self.bot._load_session()
@@ -9,22 +9,38 @@
 """
 
 import os
+import socket
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Mapping
 
 
-def _env_bool(key: str, default: bool = False) -> bool:
+# 环境变量快照 (Settings 构造时约 20 次读取共用一份 dict)
+_ENV: dict[str, str] = dict(os.environ)
+
+
+def _env_str(key: str, default: str = "", env: dict[str, str] = _ENV) -> str:
+    """解析字符串类型环境变量"""
+    return env.get(key, default)
+
+
+def _env_bool(key: str, default: bool = False, env: dict[str, str] = _ENV) -> bool:
     """解析布尔类型环境变量"""
-    val = os.getenv(key, "").strip().lower()
+    if key not in env:
+        return default
+    val = env[key].strip().lower()
     if not val:
         return default
     return val in {"1", "true", "yes", "on"}
 
 
-def _env_int(key: str, default: int) -> int:
+def _env_int(key: str, default: int, env: dict[str, str] = _ENV) -> int:
     """解析整数类型环境变量"""
-    val = os.getenv(key, "").strip()
+    if key not in env:
+        return default
+    val = env[key].strip()
     if not val:
         return default
     try:
@@ -33,17 +49,25 @@ def _env_int(key: str, default: int) -> int:
         return default
 
 
-def _env_list(key: str, sep: str = ",") -> list[str]:
+def _env_list(key: str, sep: str = ",", env: dict[str, str] = _ENV) -> list[str]:
     """解析列表类型环境变量"""
-    val = os.getenv(key, "").strip()
+    if key not in env:
+        return []
+    val = env[key].strip()
     if not val:
         return []
     return [item.strip() for item in val.split(sep) if item.strip()]
 
 
-@dataclass
+@lru_cache(maxsize=1)
+def _hostname() -> str:
+    """主机名 (首次使用时解析并缓存)"""
+    return socket.gethostname()
+
+
+@dataclass(slots=True, frozen=True)
 class Settings:
-    """应用配置"""
+    """应用配置 (只读，运行期不应修改)"""
 
     # === 基础配置 ===
     app_name: str = "WeChat FileHelper Protocol Bot"
@@ -53,12 +77,14 @@ class Settings:
 
     # === 微信配置 ===
     wechat_entry_host: str = field(
-        default_factory=lambda: os.getenv("WECHAT_ENTRY_HOST", "szfilehelper.weixin.qq.com")
+        default_factory=lambda: _env_str("WECHAT_ENTRY_HOST", "szfilehelper.weixin.qq.com")
     )
+    # 出站请求并发上限
+    wechat_max_concurrency: int = field(default_factory=lambda: _env_int("WECHAT_MAX_CONCURRENCY", 16))
 
     # === 文件存储 ===
     download_dir: Path = field(
-        default_factory=lambda: Path(os.getenv("DOWNLOAD_DIR", os.path.join(os.getcwd(), "downloads")))
+        default_factory=lambda: Path(_env_str("DOWNLOAD_DIR", os.path.join(os.getcwd(), "downloads")))
     )
     file_date_subdir: bool = field(default_factory=lambda: _env_bool("FILE_DATE_SUBDIR", True))
     auto_download: bool = field(default_factory=lambda: _env_bool("AUTO_DOWNLOAD", True))
@@ -67,17 +93,17 @@ class Settings:
 
     # === 数据库 ===
     message_db_path: Path = field(
-        default_factory=lambda: Path(os.getenv("MESSAGE_DB_PATH", os.path.join(os.getcwd(), "messages.db")))
+        default_factory=lambda: Path(_env_str("MESSAGE_DB_PATH", os.path.join(os.getcwd(), "messages.db")))
     )
 
     # === 插件 ===
     plugins_dir: Path = field(
-        default_factory=lambda: Path(os.getenv("PLUGINS_DIR", os.path.join(os.getcwd(), "plugins")))
+        default_factory=lambda: Path(_env_str("PLUGINS_DIR", os.path.join(os.getcwd(), "plugins")))
     )
 
     # === 定时任务 ===
     task_file: Path = field(
-        default_factory=lambda: Path(os.getenv("ROBOT_TASK_FILE", os.path.join(os.getcwd(), "scheduled_tasks.json")))
+        default_factory=lambda: Path(_env_str("ROBOT_TASK_FILE", os.path.join(os.getcwd(), "scheduled_tasks.json")))
     )
 
     # === 稳定性 ===
@@ -86,12 +112,12 @@ class Settings:
     max_reconnect_attempts: int = field(default_factory=lambda: _env_int("MAX_RECONNECT_ATTEMPTS", 10))
 
     # === Webhook ===
-    message_webhook_url: str = field(default_factory=lambda: os.getenv("MESSAGE_WEBHOOK_URL", "").strip())
+    message_webhook_url: str = field(default_factory=lambda: _env_str("MESSAGE_WEBHOOK_URL", "").strip())
     message_webhook_timeout: int = field(default_factory=lambda: _env_int("MESSAGE_WEBHOOK_TIMEOUT", 10))
 
     # === 聊天机器人 ===
     chatbot_enabled: bool = field(default_factory=lambda: _env_bool("CHATBOT_ENABLED", False))
-    chatbot_webhook_url: str = field(default_factory=lambda: os.getenv("CHATBOT_WEBHOOK_URL", "").strip())
+    chatbot_webhook_url: str = field(default_factory=lambda: _env_str("CHATBOT_WEBHOOK_URL", "").strip())
     chatbot_timeout: int = field(default_factory=lambda: _env_int("CHATBOT_TIMEOUT", 20))
 
     # === HTTP 安全 ===
@@ -102,25 +128,31 @@ class Settings:
     trace_redact: bool = field(default_factory=lambda: _env_bool("WECHAT_TRACE_REDACT", True))
     trace_max_body: int = field(default_factory=lambda: _env_int("WECHAT_TRACE_MAX_BODY", 4096))
     trace_dir: Path = field(
-        default_factory=lambda: Path(os.getenv("WECHAT_TRACE_DIR", os.path.join(os.getcwd(), "trace_logs")))
+        default_factory=lambda: Path(_env_str("WECHAT_TRACE_DIR", os.path.join(os.getcwd(), "trace_logs")))
     )
 
-    # === 服务器标识 ===
-    server_label: str = field(default_factory=lambda: os.getenv("ROBOT_SERVER_LABEL", "") or __import__("socket").gethostname())
+    # === 服务器标识 (未配置时回退到主机名) ===
+    _server_label: str = field(default_factory=lambda: _env_str("ROBOT_SERVER_LABEL", ""))
 
     # === 登录回调 ===
-    login_callback_url: str = field(default_factory=lambda: os.getenv("LOGIN_CALLBACK_URL", "").strip())
+    login_callback_url: str = field(default_factory=lambda: _env_str("LOGIN_CALLBACK_URL", "").strip())
+
+    # to_dict 缓存 (实例只读，首次构建后可复用)
+    _dict_view: Mapping[str, Any] | None = field(default=None, init=False, repr=False, compare=False)
 
-    def __post_init__(self):
-        """初始化后处理 - 确保目录和文件存在"""
+    @property
+    def server_label(self) -> str:
+        """服务器标识"""
+        return self._server_label or _hostname()
+
+    def ensure_runtime_files(self) -> None:
+        """确保运行时目录和文件存在 (在启动时调用)"""
         # 创建必要目录
         self.download_dir.mkdir(parents=True, exist_ok=True)
         self.plugins_dir.mkdir(parents=True, exist_ok=True)
         if self.trace_enabled:
             self.trace_dir.mkdir(parents=True, exist_ok=True)
 
-    def ensure_runtime_files(self) -> None:
-        """确保运行时文件存在 (在启动时调用)"""
         # 定时任务文件
         if not self.task_file.exists():
             self.task_file.write_text("[]", encoding="utf-8")
@@ -135,8 +167,18 @@ class Settings:
             wal_path = Path(str(self.message_db_path) + suffix)
             wal_path.unlink(missing_ok=True)
 
+    @property
+    def dict_view(self) -> Mapping[str, Any]:
+        """只读字典视图 (首次访问时构建并缓存)"""
+        if self._dict_view is None:
+            object.__setattr__(self, "_dict_view", MappingProxyType(self._build_dict()))
+        return self._dict_view
+
     def to_dict(self) -> dict[str, Any]:
         """转换为字典 (用于调试)"""
+        return dict(self.dict_view)
+
+    def _build_dict(self) -> dict[str, Any]:
         return {
             "app_name": self.app_name,
             "version": self.version,
@@ -1,5 +1,5 @@
 import asyncio
-from collections import deque
+from collections import OrderedDict, deque
 import hashlib
 import html
 import json
@@ -8,49 +8,180 @@ import os
 import random
 import re
 import time
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
 from urllib.parse import parse_qs, quote, urlparse
 
 import httpx
+import orjson
 
 
 # 预编译正则表达式 (避免每次 trace 时重新编译)
-_SANITIZE_PATTERNS = [
-    re.compile(r'(pass_ticket\s*[=:]\s*)([^&\s"\',;]+)', re.IGNORECASE),
-    re.compile(r'(webwx_data_ticket\s*[=:]\s*)([^&\s"\',;]+)', re.IGNORECASE),
-    re.compile(r'(skey\s*[=:]\s*)([^&\s"\',;]+)', re.IGNORECASE),
-    re.compile(r'(sid\s*[=:]\s*)([^&\s"\',;]+)', re.IGNORECASE),
-    re.compile(r'(wxsid\s*[=:]\s*)([^&\s"\',;]+)', re.IGNORECASE),
-    re.compile(r'(deviceid\s*[=:]\s*)([^&\s"\',;]+)', re.IGNORECASE),
-    re.compile(r'(uin\s*[=:]\s*)([^&\s"\',;]+)', re.IGNORECASE),
-    re.compile(r'(aeskey\s*[=:]\s*)([^&\s"\',;]+)', re.IGNORECASE),
-    re.compile(r'(signature\s*[=:]\s*)([^&\s"\',;]+)', re.IGNORECASE),
-]
-
-_SANITIZE_JSON_PATTERNS = [
-    re.compile(r'("pass_ticket"\s*:\s*")[^"]*(")', re.IGNORECASE),
-    re.compile(r'("webwx_data_ticket"\s*:\s*")[^"]*(")', re.IGNORECASE),
-    re.compile(r'("Skey"\s*:\s*")[^"]*(")', re.IGNORECASE),
-    re.compile(r'("Sid"\s*:\s*")[^"]*(")', re.IGNORECASE),
-    re.compile(r'("DeviceID"\s*:\s*")[^"]*(")', re.IGNORECASE),
-    re.compile(r'("Signature"\s*:\s*")[^"]*(")', re.IGNORECASE),
-    re.compile(r'("AESKey"\s*:\s*")[^"]*(")', re.IGNORECASE),
-]
+# 快速预检: 不含任何敏感键的文本 (绝大多数 trace) 直接跳过替换
+_SENSITIVE_PROBE = re.compile(
+    r"pass_ticket|webwx_data_ticket|skey|sid|deviceid|uin|aeskey|signature",
+    re.IGNORECASE,
+).search
+
+# JSON 字段与 key=value 两种形式合并为一个正则，每段文本只扫描一遍
+# (JSON 分支在前: 同一位置优先整体替换引号内的值)
+_SANITIZE_RE = re.compile(
+    r'"(?P<jk>pass_ticket|webwx_data_ticket|Skey|Sid|DeviceID|Signature|AESKey)"(?P<jsep>\s*:\s*")[^"]*"'
+    r'|(?P<k>pass_ticket|webwx_data_ticket|skey|sid|wxsid|deviceid|uin|aeskey|signature)'
+    r'(?P<sep>\s*[=:]\s*)[^&\s"\',;]+',
+    re.IGNORECASE,
+)
+
+# 文本类 Content-Type 判定 (单次扫描)
+_TEXTUAL_CT = re.compile(r"json|text|xml|javascript|html|x-www-form-urlencoded", re.IGNORECASE).search
+
+# SyncKey 条目取值
+_KEY_VAL = itemgetter("Key", "Val")
+
+# 文件消息 XML 模板
+_APPMSG_TMPL = (
+    "<appmsg appid='wxeb7ec651dd0aefa9' sdkver=''><title>"
+    "{name}</title><des></des><action></action><type>6</type>"
+    "<content></content><url></url><lowurl></lowurl><appattach>"
+    "<totallen>{size}</totallen><attachid>{mid}</attachid>"
+    "<fileext>{ext}</fileext></appattach><extinfo></extinfo></appmsg>"
+)
+
+# 随机串字符集
+_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+# trace 中整体隐藏的请求/响应头
+_SENSITIVE_HEADERS = frozenset({"cookie", "set-cookie", "authorization"})
+
+# 登录 / 同步响应解析
+_RE_QR_UUID = re.compile(r'window\.QRLogin\.uuid\s*=\s*"([^"]+)"')
+_RE_LOGIN_CODE = re.compile(r"window\.code\s*=\s*(\d+)")
+_RE_REDIRECT_URI = re.compile(r'window\.redirect_uri\s*=\s*"([^"]+)"')
+_RE_RETCODE = re.compile(r'retcode\s*:\s*"?(\d+)"?')
+_RE_SELECTOR = re.compile(r'selector\s*:\s*"?(\d+)"?')
+
+
+@lru_cache(maxsize=64)
+def _xml_tag_re(tag: str) -> re.Pattern[str]:
+    """XML 标签正则 (按标签名编译一次)"""
+    escaped = re.escape(tag)
+    return re.compile(rf"<{escaped}>(.*?)</{escaped}>", re.S)
+
+
+def _sanitize(text: str) -> str:
+    """脱敏文本中的敏感键值"""
+    if _SENSITIVE_PROBE(text) is None:
+        return text
+
+    return _SANITIZE_RE.sub(_sanitize_repl, text)
+
+
+def _sanitize_repl(match: re.Match[str]) -> str:
+    jk = match.group("jk")
+    if jk is not None:
+        return f'"{jk}"{match.group("jsep")}***"'
+    return f'{match.group("k")}{match.group("sep")}***'
+
+
+@lru_cache(maxsize=1024)
+def _sanitize_url(url: str) -> str:
+    """URL 脱敏缓存 (同一请求的 request/response trace 共用一次结果)"""
+    return _sanitize(url)
+
+
+def _tail_lines(path: Path, n: int, block_size: int = 64 * 1024) -> list[bytes]:
+    """读取文件最后 n 个非空行 (从末尾按块倒序读取，在线程池中执行)"""
+    lines: list[bytes] = []
+    with path.open("rb") as file_obj:
+        pos = file_obj.seek(0, os.SEEK_END)
+        partial = b""
+        while pos > 0 and len(lines) < n:
+            step = min(block_size, pos)
+            pos -= step
+            file_obj.seek(pos)
+            parts = (file_obj.read(step) + partial).split(b"\n")
+            # 块首可能是不完整的行，留到下一轮拼接
+            partial = parts[0]
+            for part in reversed(parts[1:]):
+                part = part.strip()
+                if part:
+                    lines.append(part)
+                    if len(lines) >= n:
+                        break
+        if pos == 0 and len(lines) < n:
+            partial = partial.strip()
+            if partial:
+                lines.append(partial)
+    lines.reverse()
+    return lines
+
+
+def _append_bytes(path: Path, content: bytes) -> None:
+    """追加写入文件 (在线程池中执行)"""
+    with path.open("ab") as file_obj:
+        file_obj.write(content)
+
+
+def _build_text_msg(item: dict[str, Any], msg_id: str, is_mine: bool) -> dict[str, Any]:
+    return {
+        "id": msg_id,
+        "type": "text",
+        "text": html.unescape(str(item.get("Content", ""))),
+        "is_mine": is_mine,
+    }
+
+
+def _build_image_msg(item: dict[str, Any], msg_id: str, is_mine: bool) -> dict[str, Any]:
+    return {
+        "id": msg_id,
+        "type": "image",
+        "text": "[Image]",
+        "file_name": item.get("FileName") or f"img_{msg_id}.jpg",
+        "is_mine": is_mine,
+    }
+
+
+def _build_app_msg(item: dict[str, Any], msg_id: str, is_mine: bool) -> dict[str, Any] | None:
+    # 仅处理文件类 AppMsg
+    if item.get("AppMsgType") != 6:
+        return None
+    file_name = item.get("FileName") or f"file_{msg_id}"
+    return {
+        "id": msg_id,
+        "type": "file",
+        "text": f"[File: {file_name}]",
+        "file_name": file_name,
+        "is_mine": is_mine,
+    }
+
+
+# MsgType -> 消息构建函数 (未列出的类型忽略)
+_MSG_BUILDERS = {
+    1: _build_text_msg,
+    3: _build_image_msg,
+    49: _build_app_msg,
+}
 
 
 class WeChatHelperBot:
-    def __init__(self, entry_host: str = "szfilehelper.weixin.qq.com"):
-        self.entry_host = entry_host
+    def __init__(self, entry_host: str = "szfilehelper.weixin.qq.com", max_concurrency: int = 16):
         self.mmweb_appid = "wx_webfilehelper"
         self.to_user_name = "filehelper"
         self.lang = "zh_CN"
+        # 固定请求头 (JSON 请求体由 orjson 预先序列化，需显式声明类型)
+        self._appid_headers = {"mmweb_appid": self.mmweb_appid}
+        self._json_headers = {"mmweb_appid": self.mmweb_appid, "content-type": "application/json"}
         self.state_path = Path(os.getcwd()) / "state.json"
 
-        self.login_host, self.file_host = self._resolve_hosts(entry_host)
+        self._set_entry_host(entry_host)
 
         self.client: httpx.AsyncClient | None = None
-        self.lock = asyncio.Lock()
+        self._cookie_cache: dict[str, str] = {}
+        # 出站请求并发上限 (突发时排队，避免连接风暴)
+        self._req_sem = asyncio.Semaphore(max(1, max_concurrency))
         self.login_callback_url = os.getenv("LOGIN_CALLBACK_URL", "").strip()
         self._login_callback_sent = False
 
@@ -73,19 +204,31 @@ class WeChatHelperBot:
         self.trace_seq = 0
 
         # Trace 缓冲队列 (批量写入优化)
-        self._trace_buffer: deque[str] = deque(maxlen=100)
+        # 不设 maxlen: 突发时不丢弃旧行，积累到阈值即提前刷新
+        self._trace_buffer: deque[bytes] = deque()
         self._trace_flush_interval = 2.0  # 2 秒刷新一次
+        self._trace_flush_threshold = 64
+        self._trace_event = asyncio.Event()
         self._trace_flush_task: asyncio.Task | None = None
 
+        # 扫码登录轮询任务 (获取二维码后启动，到达终态即结束)
+        self._login_poll_task: asyncio.Task | None = None
+
         self.device_id = self._gen_device_id()
         self.uuid = ""
         self.uuid_ts = 0.0
+        # 二维码图片只由 uuid 决定，同一 uuid 复用已下载的 PNG
+        self._qr_png = b""
+        self._qr_png_uuid = ""
 
         self.skey = ""
         self.sid = ""
         self.uin = ""
         self.pass_ticket = ""
         self.user_name = ""
+        self._refresh_auth_cache()
+        # 会话状态是否有未保存的变更 (认证字段、synckey、cookie)
+        self._session_dirty = False
 
         self.synckey: dict[str, Any] = {"Count": 0, "List": []}
         self.is_logged_in = False
@@ -94,12 +237,17 @@ class WeChatHelperBot:
 
         # 使用带限制的数据结构防止内存无限增长
         self._msg_cache: deque[dict[str, Any]] = deque(maxlen=200)
-        self._raw_by_id: dict[str, dict[str, Any]] = {}
-        self._raw_by_id_order: deque[str] = deque(maxlen=500)  # 跟踪插入顺序
-        self._seen_msg_ids: set[str] = set()
-        self._seen_msg_ids_order: deque[str] = deque(maxlen=5000)
-        self._send_msg_ids: set[str] = set()
-        self._send_msg_ids_order: deque[str] = deque(maxlen=200)
+        # OrderedDict 同时承担成员判断与插入顺序，超限时弹出最老的元素
+        self._raw_by_id: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._seen_msg_ids: OrderedDict[str, None] = OrderedDict()
+        self._send_msg_ids: OrderedDict[str, None] = OrderedDict()
+
+    def _set_entry_host(self, host: str) -> None:
+        """切换入口域名，同步更新登录/文件域名及 URL 前缀"""
+        self.entry_host = host
+        self.login_host, self.file_host = self._resolve_hosts(host)
+        self._entry_base = f"https://{host}"
+        self._file_base = f"https://{self.file_host}"
 
     def _resolve_hosts(self, host: str) -> tuple[str, str]:
         if "cmfilehelper.weixin" in host:
@@ -115,9 +263,12 @@ class WeChatHelperBot:
             # 启动 trace 刷新任务
             self._trace_flush_task = asyncio.create_task(self._trace_flush_loop())
 
+        # HTTP/2 复用单连接承载轮询/同步/下载；显式限制连接池规模
         self.client = httpx.AsyncClient(
             timeout=timeout,
             follow_redirects=True,
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60.0),
             event_hooks={
                 "request": [self._trace_on_request],
                 "response": [self._trace_on_response],
@@ -127,6 +278,15 @@ class WeChatHelperBot:
         await self.check_login_status(poll=False)
 
     async def stop(self):
+        # 停止扫码轮询任务
+        if self._login_poll_task and not self._login_poll_task.done():
+            self._login_poll_task.cancel()
+            try:
+                await self._login_poll_task
+            except asyncio.CancelledError:
+                pass
+        self._login_poll_task = None
+
         # 停止 trace 刷新任务
         if self._trace_flush_task:
             self._trace_flush_task.cancel()
@@ -174,7 +334,8 @@ class WeChatHelperBot:
             "cookies": cookies,
         }
 
-        target.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+        target.write_bytes(orjson.dumps(state, option=orjson.OPT_INDENT_2))
+        self._session_dirty = False
         return True
 
     async def _load_session(self):
@@ -182,12 +343,11 @@ class WeChatHelperBot:
             return
 
         try:
-            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            state = orjson.loads(self.state_path.read_bytes())
         except Exception:
             return
 
-        self.entry_host = state.get("entry_host", self.entry_host)
-        self.login_host, self.file_host = self._resolve_hosts(self.entry_host)
+        self._set_entry_host(state.get("entry_host", self.entry_host))
         self.device_id = state.get("device_id", self.device_id)
         self.uuid = state.get("uuid", "")
 
@@ -197,7 +357,9 @@ class WeChatHelperBot:
         self.pass_ticket = state.get("pass_ticket", "")
         self.user_name = state.get("user_name", "")
         self.synckey = state.get("synckey", {"Count": 0, "List": []})
+        self._refresh_auth_cache()
 
+        self._cookie_cache.clear()
         for item in state.get("cookies", []):
             try:
                 self.client.cookies.set(
@@ -208,6 +370,8 @@ class WeChatHelperBot:
                 )
             except Exception:
                 continue
+        # 刚从文件恢复，内存状态与文件一致
+        self._session_dirty = False
 
     async def get_login_qr(self, skip_login_check: bool = False) -> bytes:
         """
@@ -229,9 +393,19 @@ class WeChatHelperBot:
             await self._jslogin_get_uuid()
             self.last_login_message = "qr_ready"
 
-        resp = await self.client.get(f"https://login.weixin.qq.com/qrcode/{self.uuid}")
+        # 由单个后台任务持续轮询扫码状态
+        if self._login_poll_task is None or self._login_poll_task.done():
+            self._login_poll_task = asyncio.create_task(self._login_poll_loop())
+
+        if self._qr_png and self._qr_png_uuid == self.uuid:
+            return self._qr_png
+
+        uuid = self.uuid
+        resp = await self._request("GET", f"https://login.weixin.qq.com/qrcode/{uuid}")
         resp.raise_for_status()
-        return resp.content
+        self._qr_png = resp.content
+        self._qr_png_uuid = uuid
+        return self._qr_png
 
     async def get_login_status_detail(self) -> dict[str, Any]:
         return {
@@ -262,19 +436,15 @@ class WeChatHelperBot:
         if not self.trace_enabled or not self.trace_log_file.exists():
             return []
 
-        rows: deque[str] = deque(maxlen=max(1, min(limit, 1000)))
-        with self.trace_log_file.open("r", encoding="utf-8") as file_obj:
-            for line in file_obj:
-                line = line.strip()
-                if line:
-                    rows.append(line)
+        # 从文件末尾倒序读块，只读取所需的尾部行
+        rows = await asyncio.to_thread(_tail_lines, self.trace_log_file, max(1, min(limit, 1000)))
 
         records = []
         for line in rows:
             try:
-                records.append(json.loads(line))
+                records.append(orjson.loads(line))
             except Exception:
-                records.append({"raw": line})
+                records.append({"raw": line.decode("utf-8", errors="replace")})
         return records
 
     async def clear_traces(self) -> bool:
@@ -282,6 +452,38 @@ class WeChatHelperBot:
             self.trace_log_file.unlink()
         return True
 
+    def _refresh_auth_cache(self) -> None:
+        """认证字段变化后刷新派生缓存 (URL 编码值、BaseRequest)"""
+        self._q_pass_ticket = quote(self.pass_ticket, safe="")
+        self._q_skey = quote(self.skey, safe="")
+        self._q_sid = quote(self.sid, safe="")
+        self._q_uin = quote(str(self.uin), safe="")
+        # 数值 uin (供 getMe/getChat 等接口直接使用)
+        self.uin_int = int(self.uin) if str(self.uin).isdigit() else 0
+        # BaseRequest 同样只依赖认证字段，下次使用时重建
+        self._base_req: dict[str, Any] | None = None
+        # 认证变化后登录检查缓存立即失效
+        self.invalidate_login_cache()
+        self._session_dirty = True
+
+    @property
+    def session_dirty(self) -> bool:
+        """会话状态是否有未保存的变更"""
+        return self._session_dirty
+
+    def invalidate_login_cache(self) -> None:
+        """使 check_login_cached 的结果失效 (登录/掉线时调用)"""
+        self._login_cache_ts = float("-inf")
+        self._login_cache_ok = False
+
+    async def check_login_cached(self, ttl: float = 1.0) -> bool:
+        """带短 TTL 的 check_login_status(poll=False)，突发请求共享同一结果"""
+        now = time.monotonic()
+        if now - self._login_cache_ts > ttl:
+            self._login_cache_ok = await self.check_login_status(poll=False)
+            self._login_cache_ts = now
+        return self._login_cache_ok
+
     def _has_auth(self) -> bool:
         return bool(self.skey and self.sid and self.uin and self.pass_ticket)
 
@@ -313,13 +515,12 @@ class WeChatHelperBot:
                 await self._notify_login_callback_if_needed()
                 return True
 
-        if poll and self.uuid:
+        # 后台轮询任务运行中时不重复发起请求，直接读取其结果
+        polling = self._login_poll_task is not None and not self._login_poll_task.done()
+        if poll and self.uuid and not polling:
             code = await self._poll_login_once()
             if code == 200:
-                self.is_logged_in = True
-                self.last_login_message = "logged_in"
-                await self._notify_login_callback_if_needed()
-                await self.save_session()
+                await self._on_qr_login()
                 return True
 
         self.is_logged_in = False
@@ -333,40 +534,59 @@ class WeChatHelperBot:
         if not await self.check_login_status(poll=False):
             return False
 
-        async with self.lock:
-            url = f"/cgi-bin/mmwebwx-bin/webwxsendmsg?lang={self.lang}&pass_ticket={quote(self.pass_ticket, safe='')}"
-            payload = {"Type": 1, "Content": message}
-            data = await self._post_message(url, payload)
-            if not data:
-                return False
+        # 不持锁发送: 并发调用各自等待网络往返，互不串行
+        url = f"/cgi-bin/mmwebwx-bin/webwxsendmsg?lang={self.lang}&pass_ticket={self._q_pass_ticket}"
+        payload = {"Type": 1, "Content": message}
+        data = await self._post_message(url, payload)
+        if not data:
+            return False
 
-            msg_id = str(data.get("MsgID", ""))
-            if msg_id:
-                self._add_to_limited_set(self._send_msg_ids, self._send_msg_ids_order, msg_id)
-            return True
+        # 同步记录 MsgID (事件循环单线程，无需加锁)
+        msg_id = str(data.get("MsgID", ""))
+        if msg_id:
+            self._add_to_limited(self._send_msg_ids, msg_id, None, 200)
+        return True
 
     async def send_file(self, file_path: str) -> bool:
         if not await self.check_login_status(poll=False):
             return False
 
         path = Path(file_path)
-        if not path.exists():
+        try:
+            file_size = path.stat().st_size
+        except OSError:
+            return False
+
+        with path.open("rb") as file_obj:
+            return await self._send_file_obj(file_obj, path.name, file_size)
+
+    async def send_fileobj(self, file_obj: BinaryIO, file_name: str) -> bool:
+        """发送已打开的可 seek 文件对象 (如 UploadFile.file)，无需先落盘为临时文件"""
+        if not await self.check_login_status(poll=False):
             return False
 
-        file_size = path.stat().st_size
+        file_size = file_obj.seek(0, os.SEEK_END)
+        file_obj.seek(0)
+        return await self._send_file_obj(file_obj, file_name, file_size)
+
+    async def _send_file_obj(self, file_obj: BinaryIO, file_name: str, file_size: int) -> bool:
         if file_size > 25 * 1024 * 1024:
             print("Direct mode currently supports files up to 25MB")
             return False
 
-        mime_type, _ = mimetypes.guess_type(path.name)
+        mime_type, _ = mimetypes.guess_type(file_name)
         mime_type = mime_type or "application/octet-stream"
         media_type = "pic" if mime_type.startswith("image/") else "doc"
 
-        file_md5 = self._md5_file(path)
+        # 大文件摘要放到线程池 (file_digest 在 C 层计算时释放 GIL)
+        file_md5 = await asyncio.to_thread(self._md5_file, file_obj)
+        file_obj.seek(0)
         client_media_id = self._gen_msg_id()
 
         media_id = await self._webwxuploadmedia(
-            path=path,
+            file_obj=file_obj,
+            file_name=file_name,
+            file_size=file_size,
             mime_type=mime_type,
             media_type=media_type,
             file_md5=file_md5,
@@ -376,11 +596,11 @@ class WeChatHelperBot:
             return False
 
         if media_type == "pic":
-            url = f"/cgi-bin/mmwebwx-bin/webwxsendmsgimg?fun=async&f=json&pass_ticket={quote(self.pass_ticket, safe='')}"
+            url = f"/cgi-bin/mmwebwx-bin/webwxsendmsgimg?fun=async&f=json&pass_ticket={self._q_pass_ticket}"
             payload = {"MediaId": media_id, "Type": 3, "Content": ""}
         else:
-            xml_content = self._build_appmsg_xml(path.name, file_size, media_id)
-            url = f"/cgi-bin/mmwebwx-bin/webwxsendappmsg?fun=async&f=json&lang={self.lang}&pass_ticket={quote(self.pass_ticket, safe='')}"
+            xml_content = self._build_appmsg_xml(file_name, file_size, media_id)
+            url = f"/cgi-bin/mmwebwx-bin/webwxsendappmsg?fun=async&f=json&lang={self.lang}&pass_ticket={self._q_pass_ticket}"
             payload = {"Type": 6, "Content": xml_content}
 
         data = await self._post_message(url, payload)
@@ -389,25 +609,35 @@ class WeChatHelperBot:
 
         msg_id = str(data.get("MsgID", ""))
         if msg_id:
-            self._add_to_limited_set(self._send_msg_ids, self._send_msg_ids_order, msg_id)
+            self._add_to_limited(self._send_msg_ids, msg_id, None, 200)
         return True
 
     async def get_latest_messages(self, limit=10):
+        messages: list[dict[str, Any]] = []
+        await self.get_latest_messages_into(messages, limit)
+        return messages
+
+    async def get_latest_messages_into(self, buf: list[dict[str, Any]], limit=10) -> None:
+        """同 get_latest_messages，结果写入调用方复用的列表 (先清空)"""
+        buf.clear()
         if not self.is_logged_in:
             if not await self.check_login_status(poll=True):
-                return []
+                return
         elif not self._has_auth():
             self.is_logged_in = False
-            return []
+            return
 
         status = await self._synccheck()
         if status == "hasMsg":
             await self._webwxsync()
         elif status == "loginout":
             self.is_logged_in = False
-            return []
+            self.invalidate_login_cache()
+            return
 
-        return list(self._msg_cache)[-limit:]
+        # 只复制尾部 limit 条，不整体物化缓存
+        total = len(self._msg_cache)
+        buf.extend(islice(self._msg_cache, max(0, total - limit), total))
 
     async def download_message_content(self, msg_id: str, save_path: str) -> bool:
         if not await self.check_login_status(poll=False):
@@ -424,8 +654,8 @@ class WeChatHelperBot:
 
         if msg_type == 3:
             url = (
-                f"https://{self.entry_host}/cgi-bin/mmwebwx-bin/webwxgetmsgimg"
-                f"?MsgID={raw.get('MsgId')}&skey={quote(self.skey, safe='')}&type=slave"
+                f"{self._entry_base}/cgi-bin/mmwebwx-bin/webwxgetmsgimg"
+                f"?MsgID={raw.get('MsgId')}&skey={self._q_skey}&type=slave"
                 f"&mmweb_appid={self.mmweb_appid}"
             )
         elif msg_type == 49 and raw.get("AppMsgType") == 6:
@@ -434,23 +664,24 @@ class WeChatHelperBot:
             media_id = raw.get("MediaId", "")
             encry_filename = raw.get("EncryFileName", "")
             url = (
-                f"https://{self.file_host}/cgi-bin/mmwebwx-bin/webwxgetmedia"
+                f"{self._file_base}/cgi-bin/mmwebwx-bin/webwxgetmedia"
                 f"?sender={quote(sender, safe='')}"
                 f"&mediaid={quote(media_id, safe='')}"
                 f"&encryfilename={quote(encry_filename, safe='')}"
-                f"&fromuser={quote(str(self.uin), safe='')}"
-                f"&pass_ticket={quote(self.pass_ticket, safe='')}"
+                f"&fromuser={self._q_uin}"
+                f"&pass_ticket={self._q_pass_ticket}"
                 f"&webwx_data_ticket={quote(webwx_data_ticket, safe='')}"
-                f"&sid={quote(self.sid, safe='')}"
+                f"&sid={self._q_sid}"
                 f"&mmweb_appid={self.mmweb_appid}"
             )
         else:
             return False
 
         try:
-            resp = await self.client.get(url)
+            resp = await self._request("GET", url)
             resp.raise_for_status()
-            Path(save_path).write_bytes(resp.content)
+            # 大文件落盘放到线程池，避免阻塞事件循环
+            await asyncio.to_thread(Path(save_path).write_bytes, resp.content)
             return True
         except Exception as exc:
             print(f"download_message_content failed: {exc}")
@@ -480,17 +711,17 @@ class WeChatHelperBot:
             raise RuntimeError("Client not initialized")
 
         redirect_uri = quote(
-            f"https://{self.entry_host}/cgi-bin/mmwebwx-bin/webwxnewloginpage", safe=""
+            f"{self._entry_base}/cgi-bin/mmwebwx-bin/webwxnewloginpage", safe=""
         )
         now = int(time.time() * 1000)
         url = (
             f"https://{self.login_host}/jslogin?appid={self.mmweb_appid}"
             f"&redirect_uri={redirect_uri}&fun=new&lang={self.lang}&_={now}"
         )
-        resp = await self.client.get(url)
+        resp = await self._request("GET", url)
         resp.raise_for_status()
 
-        uuid = self._regex_group(resp.text, r'window\.QRLogin\.uuid\s*=\s*"([^"]+)"')
+        uuid = self._regex_group(resp.text, _RE_QR_UUID)
         if not uuid:
             raise RuntimeError(f"Cannot parse uuid from jslogin response: {resp.text[:200]}")
 
@@ -510,18 +741,18 @@ class WeChatHelperBot:
         )
 
         try:
-            resp = await self.client.get(url)
+            resp = await self._request("GET", url)
             resp.raise_for_status()
             body = resp.text
         except Exception:
             return 0
 
-        code_str = self._regex_group(body, r"window\.code\s*=\s*(\d+)")
+        code_str = self._regex_group(body, _RE_LOGIN_CODE)
         code = int(code_str) if code_str else 0
         self.last_login_code = code
 
         if code == 200:
-            redirect_uri = self._regex_group(body, r'window\.redirect_uri\s*=\s*"([^"]+)"')
+            redirect_uri = self._regex_group(body, _RE_REDIRECT_URI)
             if redirect_uri:
                 await self._complete_login(redirect_uri)
             self.last_login_message = "authorized"
@@ -535,6 +766,30 @@ class WeChatHelperBot:
 
         return code
 
+    async def _login_poll_loop(self) -> int:
+        """后台轮询扫码状态直到终态 (已扫码时缩短间隔)"""
+        try:
+            while self.uuid:
+                code = await self._poll_login_once()
+                if code == 200:
+                    await self._on_qr_login()
+                    return code
+                if code in {400, 500, 0}:
+                    return code
+                await asyncio.sleep(0.1 if code == 201 else 1.0)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            print(f"login poll failed: {exc}")
+        return 0
+
+    async def _on_qr_login(self):
+        self.is_logged_in = True
+        self.invalidate_login_cache()
+        self.last_login_message = "logged_in"
+        await self._notify_login_callback_if_needed()
+        await self.save_session()
+
     async def _complete_login(self, redirect_uri: str):
         if not self.client:
             return
@@ -543,8 +798,7 @@ class WeChatHelperBot:
         query = parse_qs(parsed.query)
         domain = parsed.netloc or self.entry_host
 
-        self.entry_host = domain
-        self.login_host, self.file_host = self._resolve_hosts(domain)
+        self._set_entry_host(domain)
 
         url = f"https://{domain}/cgi-bin/mmwebwx-bin/webwxnewloginpage"
         params = {
@@ -556,14 +810,16 @@ class WeChatHelperBot:
             "scan": (query.get("scan") or [""])[0],
         }
 
-        resp = await self.client.get(url, params=params, headers={"mmweb_appid": self.mmweb_appid})
+        resp = await self._request("GET", url, params=params, headers=self._appid_headers)
         resp.raise_for_status()
+        self._cookie_cache.clear()
 
         xml = resp.text
         self.skey = self._extract_xml_tag(xml, "skey")
         self.sid = self._extract_xml_tag(xml, "wxsid")
         self.uin = self._extract_xml_tag(xml, "wxuin")
         self.pass_ticket = self._extract_xml_tag(xml, "pass_ticket")
+        self._refresh_auth_cache()
 
         if not all([self.skey, self.sid, self.uin, self.pass_ticket]):
             raise RuntimeError("webwxnewloginpage missing auth fields")
@@ -579,7 +835,7 @@ class WeChatHelperBot:
         if not self.client:
             return False
 
-        url = f"https://{self.entry_host}/cgi-bin/mmwebwx-bin/webwxinit"
+        url = self._entry_base + "/cgi-bin/mmwebwx-bin/webwxinit"
         params = {
             "r": ~int(time.time() * 1000),
             "lang": self.lang,
@@ -588,14 +844,15 @@ class WeChatHelperBot:
         payload = {"BaseRequest": self._base_request()}
 
         try:
-            resp = await self.client.post(
+            resp = await self._request(
+                "POST",
                 url,
                 params=params,
-                json=payload,
-                headers={"mmweb_appid": self.mmweb_appid},
+                content=orjson.dumps(payload),
+                headers=self._json_headers,
             )
             resp.raise_for_status()
-            data = resp.json()
+            data = orjson.loads(resp.content)
         except Exception as exc:
             print(f"webwxinit failed: {exc}")
             return False
@@ -608,9 +865,11 @@ class WeChatHelperBot:
         self.user_name = user.get("UserName", self.user_name)
         if user.get("Uin"):
             self.uin = str(user.get("Uin"))
+            self._refresh_auth_cache()
 
         sync = data.get("SyncKey") or {"Count": 0, "List": []}
         self.synckey = sync
+        self._session_dirty = True
         return True
 
     async def _synccheck(self) -> str:
@@ -620,7 +879,7 @@ class WeChatHelperBot:
             return "loginout"
 
         synckey = self._format_synccheck_key()
-        url = f"https://{self.entry_host}/cgi-bin/mmwebwx-bin/synccheck"
+        url = self._entry_base + "/cgi-bin/mmwebwx-bin/synccheck"
         params = {
             "r": int(time.time() * 1000),
             "skey": self.skey,
@@ -632,14 +891,14 @@ class WeChatHelperBot:
         }
 
         try:
-            resp = await self.client.get(url, params=params)
+            resp = await self._request("GET", url, params=params)
             resp.raise_for_status()
             body = resp.text
         except Exception:
             return "resync"
 
-        retcode = self._regex_group(body, r'retcode\s*:\s*"?(\d+)"?')
-        selector = self._regex_group(body, r'selector\s*:\s*"?(\d+)"?')
+        retcode = self._regex_group(body, _RE_RETCODE)
+        selector = self._regex_group(body, _RE_SELECTOR)
 
         if retcode != "0":
             return "loginout"
@@ -651,7 +910,7 @@ class WeChatHelperBot:
         if not self.client:
             return []
 
-        url = f"https://{self.entry_host}/cgi-bin/mmwebwx-bin/webwxsync"
+        url = self._entry_base + "/cgi-bin/mmwebwx-bin/webwxsync"
         params = {
             "sid": self.sid,
             "skey": self.skey,
@@ -664,14 +923,15 @@ class WeChatHelperBot:
         }
 
         try:
-            resp = await self.client.post(
+            resp = await self._request(
+                "POST",
                 url,
                 params=params,
-                json=payload,
-                headers={"mmweb_appid": self.mmweb_appid},
+                content=orjson.dumps(payload),
+                headers=self._json_headers,
             )
             resp.raise_for_status()
-            data = resp.json()
+            data = orjson.loads(resp.content)
         except Exception as exc:
             print(f"webwxsync failed: {exc}")
             return []
@@ -681,6 +941,7 @@ class WeChatHelperBot:
 
         if data.get("SyncKey"):
             self.synckey = data["SyncKey"]
+            self._session_dirty = True
 
         add_msg_list = data.get("AddMsgList") or []
         normalized = self._normalize_messages(add_msg_list)
@@ -703,7 +964,7 @@ class WeChatHelperBot:
             "ts": int(time.time()),
         }
         try:
-            resp = await self.client.post(self.login_callback_url, json=payload)
+            resp = await self._request("POST", self.login_callback_url, json=payload)
             if 200 <= resp.status_code < 300:
                 self._login_callback_sent = True
         except Exception as exc:
@@ -731,8 +992,8 @@ class WeChatHelperBot:
                 "id": trace_id,
                 "ts": int(time.time() * 1000),
                 "method": request.method,
-                "url": self._sanitize_text(str(request.url)),
-                "headers": self._sanitize_headers(dict(request.headers.items())),
+                "url": self._sanitize_url(str(request.url)),
+                "headers": self._sanitize_headers(request.headers),
                 "body_preview": body_preview,
             }
         )
@@ -765,10 +1026,10 @@ class WeChatHelperBot:
                 "id": trace_id,
                 "ts": int(time.time() * 1000),
                 "method": request.method,
-                "url": self._sanitize_text(str(request.url)),
+                "url": self._sanitize_url(str(request.url)),
                 "status_code": response.status_code,
                 "duration_ms": duration_ms,
-                "headers": self._sanitize_headers(dict(response.headers.items())),
+                "headers": self._sanitize_headers(response.headers),
                 "body_preview": body_preview,
             }
         )
@@ -778,14 +1039,19 @@ class WeChatHelperBot:
         if not self.trace_enabled:
             return
 
-        line = json.dumps(row, ensure_ascii=False)
-        self._trace_buffer.append(line)
+        self._trace_buffer.append(orjson.dumps(row))
+        if len(self._trace_buffer) >= self._trace_flush_threshold:
+            self._trace_event.set()
 
     async def _trace_flush_loop(self):
-        """后台任务: 定期刷新 trace 缓冲到文件"""
+        """后台任务: 定期或缓冲达到阈值时刷新 trace 到文件"""
         while True:
             try:
-                await asyncio.sleep(self._trace_flush_interval)
+                try:
+                    await asyncio.wait_for(self._trace_event.wait(), timeout=self._trace_flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._trace_event.clear()
                 await self._flush_trace_buffer()
             except asyncio.CancelledError:
                 break
@@ -800,23 +1066,18 @@ class WeChatHelperBot:
         if not self.trace_dir.exists():
             self.trace_dir.mkdir(parents=True, exist_ok=True)
 
-        # 批量获取所有待写入的行
-        lines_to_write = []
-        async with self.trace_lock:
-            while self._trace_buffer:
-                try:
-                    lines_to_write.append(self._trace_buffer.popleft())
-                except IndexError:
-                    break
+        # 整体替换缓冲区 (单次引用交换，生产者无需等待)
+        buffer, self._trace_buffer = self._trace_buffer, deque()
 
-        if lines_to_write:
-            # 单次写入所有行 (减少 I/O 次数)
-            content = "\n".join(lines_to_write) + "\n"
-            try:
-                with self.trace_log_file.open("a", encoding="utf-8") as file_obj:
-                    file_obj.write(content)
-            except Exception as exc:
-                print(f"[Trace] Write error: {exc}")
+        # 单次写入所有行 (减少 I/O 次数)
+        content = b"\n".join(buffer) + b"\n"
+        try:
+            # trace_lock 仅用于串行化文件写入，保证并发刷新时行序
+            async with self.trace_lock:
+                # 文件写入放到线程池，避免慢磁盘阻塞事件循环
+                await asyncio.to_thread(_append_bytes, self.trace_log_file, content)
+        except Exception as exc:
+            print(f"[Trace] Write error: {exc}")
 
     def _request_body_preview(self, request: httpx.Request, content_type: str) -> str:
         try:
@@ -836,34 +1097,35 @@ class WeChatHelperBot:
         if not payload:
             return ""
 
+        # 非文本类型只需摘要，不做解码
+        if not self._is_textual_content_type(content_type):
+            return f"<<non-text {content_type or 'unknown'} {len(payload)} bytes>>"
+
         clipped = payload[: self.trace_max_body]
         suffix = ""
         if len(payload) > len(clipped):
             suffix = f" ...<truncated {len(payload) - len(clipped)} bytes>"
 
-        try:
-            text = clipped.decode("utf-8")
-        except UnicodeDecodeError:
-            text = clipped.decode("latin1", errors="replace")
-
-        if not self._is_textual_content_type(content_type):
-            return f"<<non-text {content_type or 'unknown'} {len(payload)} bytes>>"
+        # 截断处可能切开多字节字符，用替换字符兜底
+        text = clipped.decode("utf-8", errors="replace")
         return self._sanitize_text(text + suffix)
 
     def _is_textual_content_type(self, content_type: str) -> bool:
-        value = (content_type or "").lower()
-        keywords = ["json", "text", "xml", "javascript", "html", "x-www-form-urlencoded"]
-        return any(word in value for word in keywords)
-
-    def _sanitize_headers(self, headers: dict[str, Any]) -> dict[str, Any]:
-        redacted = {}
-        for key, value in headers.items():
-            lower_key = key.lower()
-            if lower_key in {"cookie", "set-cookie", "authorization"}:
-                redacted[key] = "***"
-            else:
-                redacted[key] = self._sanitize_text(str(value))
-        return redacted
+        if not content_type:
+            return False
+        if content_type.startswith("application/json"):
+            return True
+        return _TEXTUAL_CT(content_type) is not None
+
+    def _sanitize_headers(self, headers: httpx.Headers) -> dict[str, Any]:
+        # 未开启脱敏时直接复制，不逐项处理
+        if not self.trace_redact:
+            return dict(headers.items())
+        # httpx.Headers.items() 已返回小写键并合并重复头，单次遍历直接生成结果
+        return {
+            key: "***" if key in _SENSITIVE_HEADERS else _sanitize(value)
+            for key, value in headers.items()
+        }
 
     def _sanitize_text(self, text: str) -> str:
         """使用预编译正则脱敏文本"""
@@ -873,16 +1135,23 @@ class WeChatHelperBot:
         if text is None:
             return ""
 
-        sanitized = str(text)
-
-        # 使用预编译的正则表达式 (模块级别定义)
-        for pattern in _SANITIZE_PATTERNS:
-            sanitized = pattern.sub(r'\1***', sanitized)
+        return _sanitize(str(text))
 
-        for pattern in _SANITIZE_JSON_PATTERNS:
-            sanitized = pattern.sub(r'\1***\2', sanitized)
-
-        return sanitized
+    def _sanitize_url(self, url: str) -> str:
+        """URL 脱敏 (结果按 URL 缓存，不缓存 body 以免无限增长)"""
+        if not self.trace_redact:
+            return url
+        return _sanitize_url(url)
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """经并发信号量发送请求"""
+        async with self._req_sem:
+            resp = await self.client.request(method, url, **kwargs)
+        if "set-cookie" in resp.headers:
+            # cookie 可能被轮换 (webwx_data_ticket 等)，丢弃查询缓存
+            self._cookie_cache.clear()
+            self._session_dirty = True
+        return resp
 
     async def _post_message(self, url: str, msg_fields: dict[str, Any]) -> dict[str, Any] | None:
         if not self.client:
@@ -901,15 +1170,16 @@ class WeChatHelperBot:
             "Scene": 0,
         }
 
-        full_url = f"https://{self.entry_host}{url}"
+        full_url = self._entry_base + url
         try:
-            resp = await self.client.post(
+            resp = await self._request(
+                "POST",
                 full_url,
-                json=payload,
-                headers={"mmweb_appid": self.mmweb_appid},
+                content=orjson.dumps(payload),
+                headers=self._json_headers,
             )
             resp.raise_for_status()
-            data = resp.json()
+            data = orjson.loads(resp.content)
         except Exception as exc:
             print(f"post_message failed: {exc}")
             return None
@@ -921,7 +1191,9 @@ class WeChatHelperBot:
 
     async def _webwxuploadmedia(
         self,
-        path: Path,
+        file_obj: BinaryIO,
+        file_name: str,
+        file_size: int,
         mime_type: str,
         media_type: str,
         file_md5: str,
@@ -930,7 +1202,6 @@ class WeChatHelperBot:
         if not self.client:
             return ""
 
-        file_size = path.stat().st_size
         webwx_data_ticket = self._get_cookie("webwx_data_ticket")
         if not webwx_data_ticket:
             print("webwx_data_ticket cookie missing")
@@ -949,35 +1220,36 @@ class WeChatHelperBot:
         }
 
         data = {
-            "name": path.name,
+            "name": file_name,
             "type": mime_type,
             "lastModifiedDate": "Thu Jan 01 1970 08:00:00 GMT+0800",
             "size": str(file_size),
             "mediatype": media_type,
-            "uploadmediarequest": json.dumps(upload_req, ensure_ascii=False),
+            "uploadmediarequest": orjson.dumps(upload_req).decode(),
             "webwx_data_ticket": webwx_data_ticket,
             "pass_ticket": self.pass_ticket,
         }
 
         upload_url = (
-            f"https://{self.file_host}/cgi-bin/mmwebwx-bin/webwxuploadmedia"
+            f"{self._file_base}/cgi-bin/mmwebwx-bin/webwxuploadmedia"
             f"?f=json&random={self._random_string(4)}"
         )
 
-        with path.open("rb") as file_obj:
-            files = {"filename": (path.name, file_obj, mime_type)}
-            try:
-                resp = await self.client.post(
-                    upload_url,
-                    data=data,
-                    files=files,
-                    headers={"mmweb_appid": self.mmweb_appid},
-                )
-                resp.raise_for_status()
-                result = resp.json()
-            except Exception as exc:
-                print(f"webwxuploadmedia failed: {exc}")
-                return ""
+        # 传入文件句柄，httpx multipart 按块读取发送，不整体读入内存
+        files = {"filename": (file_name, file_obj, mime_type)}
+        try:
+            resp = await self._request(
+                "POST",
+                upload_url,
+                data=data,
+                files=files,
+                headers=self._appid_headers,
+            )
+            resp.raise_for_status()
+            result = orjson.loads(resp.content)
+        except Exception as exc:
+            print(f"webwxuploadmedia failed: {exc}")
+            return ""
 
         if (result.get("BaseResponse") or {}).get("Ret") != 0:
             print(f"webwxuploadmedia ret != 0: {result}")
@@ -987,6 +1259,7 @@ class WeChatHelperBot:
 
     def _normalize_messages(self, add_msg_list: list[dict[str, Any]]) -> list[dict[str, Any]]:
         out: list[dict[str, Any]] = []
+        to_user_name = self.to_user_name
         for item in add_msg_list:
             msg_id = str(item.get("MsgId", ""))
             if not msg_id:
@@ -996,125 +1269,93 @@ class WeChatHelperBot:
 
             from_user = item.get("FromUserName", "")
             to_user = item.get("ToUserName", "")
-            if from_user != self.to_user_name and to_user != self.to_user_name:
+            if from_user != to_user_name and to_user != to_user_name:
                 continue
 
-            msg_type = item.get("MsgType")
-            app_msg_type = item.get("AppMsgType")
-
-            normalized: dict[str, Any] | None = None
-            if msg_type == 1:
-                normalized = {
-                    "id": msg_id,
-                    "type": "text",
-                    "text": html.unescape(str(item.get("Content", ""))),
-                    "is_mine": from_user != self.to_user_name,
-                }
-            elif msg_type == 3:
-                normalized = {
-                    "id": msg_id,
-                    "type": "image",
-                    "text": "[Image]",
-                    "file_name": item.get("FileName") or f"img_{msg_id}.jpg",
-                    "is_mine": from_user != self.to_user_name,
-                }
-            elif msg_type == 49 and app_msg_type == 6:
-                file_name = item.get("FileName") or f"file_{msg_id}"
-                normalized = {
-                    "id": msg_id,
-                    "type": "file",
-                    "text": f"[File: {file_name}]",
-                    "file_name": file_name,
-                    "is_mine": from_user != self.to_user_name,
-                }
+            builder = _MSG_BUILDERS.get(item.get("MsgType"))
+            normalized = builder(item, msg_id, from_user != to_user_name) if builder else None
 
             # 使用有限集合添加
-            self._add_to_limited_set(self._seen_msg_ids, self._seen_msg_ids_order, msg_id)
-            self._add_to_limited_dict(self._raw_by_id, self._raw_by_id_order, msg_id, item)
+            self._add_to_limited(self._seen_msg_ids, msg_id, None, 5000)
+            self._add_to_limited(self._raw_by_id, msg_id, item, 500)
 
             if normalized:
                 out.append(normalized)
 
         return out
 
-    def _add_to_limited_set(self, s: set, order: deque, value: str):
-        """添加到有限集合，自动清理最老的元素"""
-        if value in s:
-            return
-        s.add(value)
-        order.append(value)
-        # 当 order 满了时，deque 会自动移除最老的元素
-        # 但我们需要同步清理 set
-        if len(s) > order.maxlen + 100:
-            # 批量清理，避免频繁操作
-            valid_keys = set(order)
-            to_remove = s - valid_keys
-            s -= to_remove
-
-    def _add_to_limited_dict(self, d: dict, order: deque, key: str, value: Any):
-        """添加到有限字典，自动清理最老的元素"""
-        d[key] = value
-        order.append(key)
-        # 当 order 满了时，deque 会自动移除最老的元素
-        # 但我们需要同步清理 dict
-        if len(d) > order.maxlen + 100:
-            # 批量清理，避免频繁操作
-            valid_keys = set(order)
-            to_remove = [k for k in d if k not in valid_keys]
-            for k in to_remove:
-                del d[k]
+    def _add_to_limited(self, od: OrderedDict, key: str, value: Any, maxlen: int):
+        """添加到有限 OrderedDict (已存在的键保持原位)，超限时弹出最老的元素"""
+        od[key] = value
+        if len(od) > maxlen:
+            od.popitem(last=False)
 
     def _build_appmsg_xml(self, file_name: str, file_size: int, media_id: str) -> str:
-        ext = Path(file_name).suffix.replace(".", "") or "bin"
-        return (
-            "<appmsg appid='wxeb7ec651dd0aefa9' sdkver=''><title>"
-            f"{file_name}</title><des></des><action></action><type>6</type>"
-            "<content></content><url></url><lowurl></lowurl><appattach>"
-            f"<totallen>{file_size}</totallen><attachid>{media_id}</attachid>"
-            f"<fileext>{ext}</fileext></appattach><extinfo></extinfo></appmsg>"
+        # 文件名来自客户端: 只取 basename，并转义后再嵌入 XML
+        name = os.path.basename(file_name.replace("\\", "/")) or "file"
+        ext = Path(name).suffix.replace(".", "") or "bin"
+        return _APPMSG_TMPL.format_map(
+            {"name": html.escape(name), "size": file_size, "mid": media_id, "ext": html.escape(ext)}
         )
 
     def _base_request(self) -> dict[str, Any]:
-        return {
-            "Uin": int(self.uin) if str(self.uin).isdigit() else self.uin,
-            "Sid": self.sid,
-            "Skey": self.skey,
-            "DeviceID": self.device_id,
-        }
+        # 只读共享: 调用方仅将其嵌入请求体，不做修改
+        if self._base_req is None:
+            self._base_req = {
+                "Uin": self.uin_int if str(self.uin).isdigit() else self.uin,
+                "Sid": self.sid,
+                "Skey": self.skey,
+                "DeviceID": self.device_id,
+            }
+        return self._base_req
 
     def _format_synccheck_key(self) -> str:
         keys = (self.synckey or {}).get("List") or []
-        pairs = [f"{item.get('Key')}_{item.get('Val')}" for item in keys if "Key" in item and "Val" in item]
-        return "|".join(pairs)
+        try:
+            # 服务端返回的条目通常完整，直接取值
+            return "|".join([f"{k}_{v}" for k, v in map(_KEY_VAL, keys)])
+        except KeyError:
+            return "|".join([f"{item['Key']}_{item['Val']}" for item in keys if "Key" in item and "Val" in item])
 
     def _get_cookie(self, name: str) -> str:
         if not self.client:
             return ""
-        for cookie in self.client.cookies.jar:
-            if cookie.name == name:
-                return cookie.value
-        return ""
+        cached = self._cookie_cache.get(name)
+        if cached:
+            return cached
+        try:
+            value = self.client.cookies.get(name, "")
+        except httpx.CookieConflict:
+            # 多个域下同名 cookie: 沿用首个匹配项
+            value = next((c.value for c in self.client.cookies.jar if c.name == name), "")
+        if value:
+            # 仅缓存命中值，登录 / 恢复会话时清空
+            self._cookie_cache[name] = value
+        return value or ""
 
     def _extract_xml_tag(self, xml_text: str, tag: str) -> str:
-        return self._regex_group(xml_text, rf"<{tag}>(.*?)</{tag}>", flags=re.S)
+        match = _xml_tag_re(tag).search(xml_text)
+        return match.group(1) if match else ""
 
     def _gen_device_id(self) -> str:
-        return "".join(str(random.randint(0, 9)) for _ in range(15))
+        return f"{random.randrange(10**15):015d}"
 
     def _gen_msg_id(self) -> str:
-        return str(int(time.time() * 1000)) + str(random.randint(100, 999))
+        return f"{int(time.time() * 1000)}{random.randrange(100, 1000)}"
 
-    def _md5_file(self, path: Path) -> str:
+    def _md5_file(self, file_obj: BinaryIO) -> str:
+        # Python 3.11+: 整个读取/摘要循环在 C 层完成
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(file_obj, "md5").hexdigest()
+        # 旧版本回退: 4MB 分块，减少解释器循环次数
         digest = hashlib.md5()
-        with path.open("rb") as file_obj:
-            for chunk in iter(lambda: file_obj.read(1024 * 1024), b""):
-                digest.update(chunk)
+        for chunk in iter(lambda: file_obj.read(4 * 1024 * 1024), b""):
+            digest.update(chunk)
         return digest.hexdigest()
 
     def _random_string(self, n: int) -> str:
-        alphabet = "abcdefghijklmnopqrstuvwxyz0123456789"
-        return "".join(random.choice(alphabet) for _ in range(n))
+        return "".join(random.choices(_ALPHABET, k=n))
 
-    def _regex_group(self, text: str, pattern: str, flags: int = 0) -> str:
-        match = re.search(pattern, text, flags)
+    def _regex_group(self, text: str, pattern: re.Pattern[str]) -> str:
+        match = pattern.search(text)
         return match.group(1) if match else ""
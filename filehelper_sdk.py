@@ -31,9 +31,19 @@ from typing import Any
 from dataclasses import dataclass
 
 import httpx
+import orjson
 
 
-@dataclass
+# 连接池: 轮询与发送复用少量长连接 (HTTPS 部署时经 ALPN 协商 HTTP/2 多路复用)
+_LIMITS = httpx.Limits(max_keepalive_connections=4, max_connections=8)
+
+
+def _drop_none(body: dict) -> dict:
+    """去掉值为 None 的字段 (服务端均有默认值，减小请求体)"""
+    return {k: v for k, v in body.items() if v is not None}
+
+
+@dataclass(slots=True)
 class Message:
     """消息对象"""
     message_id: str
@@ -45,17 +55,18 @@ class Message:
 
     @classmethod
     def from_dict(cls, data: dict) -> "Message":
+        g = data.get
         return cls(
-            message_id=data.get("message_id", ""),
-            date=data.get("date", 0),
-            text=data.get("text", ""),
-            type=data.get("type", "text"),
-            document=data.get("document"),
-            reply_to_message_id=data.get("reply_to_message_id"),
+            g("message_id", ""),
+            g("date", 0),
+            g("text", ""),
+            g("type", "text"),
+            g("document"),
+            g("reply_to_message_id"),
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Update:
     """更新对象"""
     update_id: int
@@ -63,10 +74,8 @@ class Update:
 
     @classmethod
     def from_dict(cls, data: dict) -> "Update":
-        return cls(
-            update_id=data.get("update_id", 0),
-            message=Message.from_dict(data.get("message", {})),
-        )
+        g = data.get
+        return cls(g("update_id", 0), Message.from_dict(g("message", {})))
 
 
 class Bot:
@@ -79,17 +88,22 @@ class Bot:
     def __init__(self, base_url: str = "http://127.0.0.1:8000", timeout: int = 30):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
-        self._client = httpx.Client(timeout=timeout)
+        self._client = httpx.Client(
+            timeout=timeout,
+            transport=httpx.HTTPTransport(http2=True, limits=_LIMITS, retries=1),
+        )
         self._offset = 0
 
     def _request(self, method: str, endpoint: str, **kwargs) -> dict:
         url = f"{self.base_url}{endpoint}"
         resp = self._client.request(method, url, **kwargs)
-        resp.raise_for_status()
-        return resp.json()
+        # 成功路径只比较状态码，错误时仍由 httpx 构造 HTTPStatusError
+        if resp.status_code >= 400:
+            resp.raise_for_status()
+        return orjson.loads(resp.content)
 
     def _post(self, endpoint: str, json: dict | None = None) -> dict:
-        return self._request("POST", endpoint, json=json or {})
+        return self._request("POST", endpoint, json=_drop_none(json) if json else {})
 
     def _get(self, endpoint: str, params: dict | None = None) -> dict:
         return self._request("GET", endpoint, params=params or {})
@@ -113,17 +127,18 @@ class Bot:
         Args:
             offset: 从此 update_id 之后开始获取
             limit: 最大返回数量
-            timeout: 长轮询超时 (暂不支持)
+            timeout: 长轮询超时秒数 (无新消息时服务端最多等待该时长)
             auto_offset: 自动更新 offset
         """
         if offset is None:
             offset = self._offset
 
-        result = self._get("/bot/getUpdates", params={
-            "offset": offset,
-            "limit": limit,
-            "timeout": timeout,
-        })
+        params = {"offset": offset, "limit": limit, "timeout": timeout}
+        if timeout > 0:
+            # 长轮询: 客户端超时需覆盖服务端等待时长
+            result = self._request("GET", "/bot/getUpdates", params=params, timeout=self.timeout + timeout)
+        else:
+            result = self._get("/bot/getUpdates", params=params)
 
         updates = [Update.from_dict(u) for u in result.get("result", [])]
 
@@ -279,17 +294,22 @@ class AsyncBot:
     def __init__(self, base_url: str = "http://127.0.0.1:8000", timeout: int = 30):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
-        self._client = httpx.AsyncClient(timeout=timeout)
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            transport=httpx.AsyncHTTPTransport(http2=True, limits=_LIMITS, retries=1),
+        )
         self._offset = 0
 
     async def _request(self, method: str, endpoint: str, **kwargs) -> dict:
         url = f"{self.base_url}{endpoint}"
         resp = await self._client.request(method, url, **kwargs)
-        resp.raise_for_status()
-        return resp.json()
+        # 成功路径只比较状态码，错误时仍由 httpx 构造 HTTPStatusError
+        if resp.status_code >= 400:
+            resp.raise_for_status()
+        return orjson.loads(resp.content)
 
     async def _post(self, endpoint: str, json: dict | None = None) -> dict:
-        return await self._request("POST", endpoint, json=json or {})
+        return await self._request("POST", endpoint, json=_drop_none(json) if json else {})
 
     async def _get(self, endpoint: str, params: dict | None = None) -> dict:
         return await self._request("GET", endpoint, params=params or {})
@@ -307,11 +327,12 @@ class AsyncBot:
         if offset is None:
             offset = self._offset
 
-        result = await self._get("/bot/getUpdates", params={
-            "offset": offset,
-            "limit": limit,
-            "timeout": timeout,
-        })
+        params = {"offset": offset, "limit": limit, "timeout": timeout}
+        if timeout > 0:
+            # 长轮询: 客户端超时需覆盖服务端等待时长
+            result = await self._request("GET", "/bot/getUpdates", params=params, timeout=self.timeout + timeout)
+        else:
+            result = await self._get("/bot/getUpdates", params=params)
 
         updates = [Update.from_dict(u) for u in result.get("result", [])]
 
@@ -421,14 +442,23 @@ class Updater:
         """添加消息处理函数"""
         self.handlers.append(handler)
 
-    def start_polling(self, interval: float = 1.0):
-        """开始轮询 (阻塞)"""
+    def start_polling(self, interval: float = 1.0, timeout: int = 0, max_interval: float = 10.0):
+        """
+        开始轮询 (阻塞)
+
+        Args:
+            interval: 空轮询后的初始等待间隔
+            timeout: 长轮询超时 (透传给 getUpdates)
+            max_interval: 连续空轮询时的最大等待间隔
+        """
         self._running = True
         print("[Updater] Polling started...")
 
+        empty_streak = 0
         while self._running:
+            updates: list[Update] = []
             try:
-                updates = self.bot.get_updates(auto_offset=True)
+                updates = self.bot.get_updates(timeout=timeout, auto_offset=True)
                 for update in updates:
                     for handler in self.handlers:
                         try:
@@ -438,7 +468,12 @@ class Updater:
             except Exception as e:
                 print(f"[Updater] Polling error: {e}")
 
-            time.sleep(interval)
+            # 有消息时立即继续拉取；空轮询 (或出错) 时指数退避
+            if updates:
+                empty_streak = 0
+                continue
+            time.sleep(min(interval * 2 ** empty_streak, max_interval))
+            empty_streak = min(empty_streak + 1, 16)
 
     def stop(self):
         """停止轮询"""
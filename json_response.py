@@ -0,0 +1,19 @@
+"""
+JSON 响应模块 - 基于 orjson 的响应类
+
+fastapi.responses.ORJSONResponse 在新版 FastAPI 中已废弃，这里提供等价实现:
+- dict / list / dataclass 由 orjson 在 C 层直接序列化
+- 作为 FastAPI default_response_class 以及各高频端点的直接返回值
+"""
+
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """使用 orjson 序列化的 JSON 响应"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
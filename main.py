@@ -11,44 +11,56 @@ WeChat FileHelper Protocol Bot - FastAPI 服务入口
 
 from __future__ import annotations
 
-import os
-import shutil
-import tempfile
+import asyncio
+import mimetypes
 from contextlib import asynccontextmanager
 from dataclasses import asdict
 
-from fastapi import FastAPI, HTTPException, Query, Response, UploadFile, File
+from fastapi import Depends, FastAPI, HTTPException, Query, Response, UploadFile, File
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
 import direct_bot
 import processor
 import plugin_base
-from background import BackgroundTasks
+from background import BackgroundTasks, StabilityState
 from config import settings
+from json_response import ORJSONResponse
 from routes import bot_router, wechat_router, files_router
 from routes.bot import init as init_bot_routes
 from routes.wechat import init as init_wechat_routes
-from routes.files import init as init_files_routes
+from routes.files import init as init_files_routes, downloads_refresher
 
 
 # === 全局实例 ===
 
-wechat_bot = direct_bot.WeChatHelperBot(entry_host=settings.wechat_entry_host)
+wechat_bot = direct_bot.WeChatHelperBot(
+    entry_host=settings.wechat_entry_host,
+    max_concurrency=settings.wechat_max_concurrency,
+)
 command_processor = processor.CommandProcessor(wechat_bot, download_dir=str(settings.download_dir))
 
 # 稳定性状态
-stability_state = {
-    "reconnect_attempts": 0,
-    "last_heartbeat": 0,
-    "last_message_time": 0,
-    "total_messages": 0,
-    "errors": [],
-}
+stability_state = StabilityState()
 
 # 后台任务管理器
 background_tasks: BackgroundTasks | None = None
 
+# 常见文件类型 (启动时注册，保证查表命中且不受系统 mime.types 差异影响)
+_COMMON_MIME_TYPES = (
+    ("image/jpeg", ".jpg"),
+    ("image/png", ".png"),
+    ("image/gif", ".gif"),
+    ("image/webp", ".webp"),
+    ("video/mp4", ".mp4"),
+    ("audio/mpeg", ".mp3"),
+    ("application/pdf", ".pdf"),
+    ("application/zip", ".zip"),
+    ("text/plain", ".txt"),
+    ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", ".docx"),
+    ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"),
+)
+
 
 # === 生命周期 ===
 
@@ -56,6 +68,11 @@ background_tasks: BackgroundTasks | None = None
 async def lifespan(app: FastAPI):
     global background_tasks
 
+    # 启动时加载 mimetypes 数据库，避免首个文件消息承担初始化开销
+    mimetypes.init()
+    for mime_type, ext in _COMMON_MIME_TYPES:
+        mimetypes.add_type(mime_type, ext)
+
     # 启动核心服务
     await wechat_bot.start(headless=True)
     await command_processor.start()
@@ -90,12 +107,20 @@ async def lifespan(app: FastAPI):
     )
     background_tasks.start_all()
 
+    # 下载目录缓存后台刷新
+    refresher_task = asyncio.create_task(downloads_refresher())
+
     yield
 
     # 执行插件 on_unload 钩子
     await plugin_base.run_on_unload_handlers()
 
     # 停止后台任务
+    refresher_task.cancel()
+    try:
+        await refresher_task
+    except asyncio.CancelledError:
+        pass
     if background_tasks:
         await background_tasks.stop_all()
 
@@ -106,13 +131,16 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     title=settings.app_name,
     description="Telegram Bot API 兼容的微信文件传输助手机器人框架",
     version=settings.version,
 )
 
 # 静态文件
-app.mount("/static", StaticFiles(directory=str(settings.download_dir)), name="static")
+# FileResponse 分块读取并在线程池中完成 IO，不阻塞事件循环；
+# 大文件下载量较大时建议由前置 nginx 直接服务 DOWNLOAD_DIR (sendfile 零拷贝)
+app.mount("/static", StaticFiles(directory=str(settings.download_dir), follow_symlink=False), name="static")
 
 # 注册核心路由
 app.include_router(bot_router)
@@ -160,10 +188,11 @@ class SendPhotoPayload(BaseModel):
 @app.get("/")
 async def root():
     """服务状态概览"""
-    is_logged_in = await wechat_bot.check_login_status(poll=False)
+    is_logged_in = await wechat_bot.check_login_cached()
     login = await wechat_bot.get_login_status_detail()
     framework_state = command_processor.get_state()
-    return {
+    # 高频端点直接返回 ORJSONResponse，跳过 jsonable_encoder
+    return ORJSONResponse({
         "service": settings.app_name,
         "version": settings.version,
         "backend": "direct-protocol",
@@ -171,12 +200,12 @@ async def root():
         "login": login,
         "framework": framework_state,
         "stability": {
-            "reconnect_attempts": stability_state["reconnect_attempts"],
-            "last_heartbeat": stability_state["last_heartbeat"],
-            "total_messages": stability_state["total_messages"],
-            "recent_errors": len(stability_state["errors"]),
+            "reconnect_attempts": stability_state.reconnect_attempts,
+            "last_heartbeat": stability_state.last_heartbeat,
+            "total_messages": stability_state.total_messages,
+            "recent_errors": len(stability_state.errors),
         },
-    }
+    })
 
 
 @app.get("/qr")
@@ -201,47 +230,39 @@ async def login_status(auto_poll: bool = Query(default=True)):
     """获取登录状态 (快捷入口)"""
     if auto_poll:
         await wechat_bot.check_login_status(poll=True)
-    return await wechat_bot.get_login_status_detail()
+    return ORJSONResponse(await wechat_bot.get_login_status_detail())
 
 
-@app.post("/send")
-async def send_message_simple(msg: Message):
-    """简单发送接口 - 使用 /bot/sendMessage 获得标准 API"""
-    if not await wechat_bot.check_login_status(poll=False):
+async def require_login() -> None:
+    """登录校验依赖 (1 秒内的突发请求共享同一次检查结果)"""
+    if not await wechat_bot.check_login_cached():
         raise HTTPException(status_code=401, detail="Unauthorized")
 
+
+@app.post("/send", dependencies=[Depends(require_login)])
+async def send_message_simple(msg: Message):
+    """简单发送接口 - 使用 /bot/sendMessage 获得标准 API"""
     success = await wechat_bot.send_text(msg.content)
     if not success:
         raise HTTPException(status_code=500, detail="send_text failed")
     return {"ok": True, "result": {"text": msg.content}}
 
 
-@app.post("/upload")
+@app.post("/upload", dependencies=[Depends(require_login)])
 async def upload_file(file: UploadFile = File(...)):
     """上传并发送文件 (快捷入口)"""
-    if not await wechat_bot.check_login_status(poll=False):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    suffix = os.path.splitext(file.filename or "file")[1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = tmp.name
-
-    try:
-        success = await wechat_bot.send_file(tmp_path)
-        if not success:
-            raise HTTPException(status_code=500, detail="send_file failed")
-        return {"status": "sent", "filename": file.filename}
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+    # 直接发送 UploadFile 的底层文件 (大文件已由 Starlette 落盘)，不再复制到临时文件
+    success = await wechat_bot.send_fileobj(file.file, file.filename or "file")
+    if not success:
+        raise HTTPException(status_code=500, detail="send_file failed")
+    return {"status": "sent", "filename": file.filename}
 
 
 @app.get("/messages")
 async def get_messages(limit: int = Query(default=10, ge=1, le=100)):
     """获取最近消息 (内存缓存)"""
     messages = await wechat_bot.get_latest_messages(limit)
-    return {"ok": True, "result": messages}
+    return ORJSONResponse({"ok": True, "result": messages})
 
 
 @app.post("/save_session")
@@ -270,7 +291,7 @@ async def bot_get_updates(
 @app.post("/bot/sendMessage")
 async def bot_send_message(payload: SendMessagePayload):
     """https://core.telegram.org/bots/api#sendmessage (兼容入口)"""
-    if not await wechat_bot.check_login_status(poll=False):
+    if not await wechat_bot.check_login_cached():
         return {"ok": False, "error_code": 401, "description": "Unauthorized"}
 
     reply_to = str(payload.reply_to_message_id) if payload.reply_to_message_id else None
@@ -284,7 +305,7 @@ async def bot_send_message(payload: SendMessagePayload):
 @app.post("/bot/sendDocument")
 async def bot_send_document(payload: SendDocumentPayload):
     """https://core.telegram.org/bots/api#senddocument (兼容入口)"""
-    if not await wechat_bot.check_login_status(poll=False):
+    if not await wechat_bot.check_login_cached():
         return {"ok": False, "error_code": 401, "description": "Unauthorized"}
 
     file_path = payload.document or payload.file_path
@@ -306,7 +327,7 @@ async def bot_send_document(payload: SendDocumentPayload):
 @app.post("/bot/sendPhoto")
 async def bot_send_photo(payload: SendPhotoPayload):
     """https://core.telegram.org/bots/api#sendphoto (兼容入口)"""
-    if not await wechat_bot.check_login_status(poll=False):
+    if not await wechat_bot.check_login_cached():
         return {"ok": False, "error_code": 401, "description": "Unauthorized"}
 
     file_path = payload.photo or payload.file_path
@@ -331,7 +352,7 @@ async def bot_get_me():
     return {
         "ok": True,
         "result": {
-            "id": int(wechat_bot.uin) if wechat_bot.uin and wechat_bot.uin.isdigit() else 0,
+            "id": wechat_bot.uin_int,
             "is_bot": True,
             "first_name": "文件传输助手",
             "username": "filehelper",
@@ -348,7 +369,7 @@ async def bot_get_chat(chat_id: str | int | None = Query(default=None)):
     return {
         "ok": True,
         "result": {
-            "id": int(wechat_bot.uin) if wechat_bot.uin and wechat_bot.uin.isdigit() else 0,
+            "id": wechat_bot.uin_int,
             "type": "private",
             "first_name": "文件传输助手",
             "username": "filehelper",
@@ -415,4 +436,6 @@ async def bot_get_file(file_id: str = Query(...)):
 if __name__ == "__main__":
     import uvicorn
 
+    # uvicorn[standard] 提供 uvloop + httptools，默认 (auto) 即自动选用
+    # 登录态保存在进程内，只能单 worker 运行
     uvicorn.run(app, host=settings.host, port=settings.port)
@@ -139,17 +139,18 @@ class PluginLoader:
             path = route_info.path
             handler = route_info.handler
             tags = route_info.tags or ["Plugins"]
+            # 插件返回的是自行构造的 dict，不从返回注解推断 response_model 做二次校验
 
             if method == "GET":
-                app.get(path, tags=tags)(handler)
+                app.get(path, tags=tags, response_model=None)(handler)
             elif method == "POST":
-                app.post(path, tags=tags)(handler)
+                app.post(path, tags=tags, response_model=None)(handler)
             elif method == "PUT":
-                app.put(path, tags=tags)(handler)
+                app.put(path, tags=tags, response_model=None)(handler)
             elif method == "DELETE":
-                app.delete(path, tags=tags)(handler)
+                app.delete(path, tags=tags, response_model=None)(handler)
             elif method == "PATCH":
-                app.patch(path, tags=tags)(handler)
+                app.patch(path, tags=tags, response_model=None)(handler)
             else:
                 print(f"[PluginLoader] Unknown HTTP method: {method}")
                 continue
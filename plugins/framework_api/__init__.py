@@ -12,10 +12,11 @@
 这是一个默认插件，可通过删除此文件禁用这些接口。
 """
 
+import re
 import time
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 from plugin_base import route
 
@@ -27,11 +28,23 @@ class ChatModePayload(BaseModel):
     enabled: bool
 
 
+_TIME_HM_RE = re.compile(r"([01]\d|2[0-3]):[0-5]\d")
+
+
 class TaskCreatePayload(BaseModel):
-    time_hm: str = Field(pattern=r"^([01]\d|2[0-3]):[0-5]\d$")
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    time_hm: str
     command: str = Field(min_length=1)
     description: str = ""
 
+    @field_validator("time_hm")
+    @classmethod
+    def _check_time_hm(cls, value: str) -> str:
+        if not _TIME_HM_RE.fullmatch(value):
+            raise ValueError("time_hm must be HH:MM")
+        return value
+
 
 class TaskEnabledPayload(BaseModel):
     enabled: bool
@@ -169,12 +182,12 @@ async def health_check() -> dict[str, Any]:
     bot = _get_bot()
     stability = _get_stability()
 
-    is_logged_in = await bot.check_login_status(poll=False)
+    is_logged_in = await bot.check_login_cached()
     return {
         "status": "healthy" if is_logged_in else "degraded",
         "logged_in": is_logged_in,
         "uptime": int(time.time() - processor.started_at),
-        "stability": stability,
+        "stability": stability.to_dict(),
     }
 
 
@@ -185,12 +198,12 @@ async def stability_status() -> dict[str, Any]:
 
     stability = _get_stability()
     return {
-        "reconnect_attempts": stability["reconnect_attempts"],
+        "reconnect_attempts": stability.reconnect_attempts,
         "max_reconnect_attempts": settings.max_reconnect_attempts,
-        "last_heartbeat": stability["last_heartbeat"],
-        "last_message_time": stability["last_message_time"],
-        "total_messages": stability["total_messages"],
-        "recent_errors": stability["errors"],
+        "last_heartbeat": stability.last_heartbeat,
+        "last_message_time": stability.last_message_time,
+        "total_messages": stability.total_messages,
+        "recent_errors": list(stability.errors),
         "config": {
             "heartbeat_interval": settings.heartbeat_interval,
             "reconnect_delay": settings.reconnect_delay,
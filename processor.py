@@ -64,6 +64,8 @@ class CommandProcessor:
 
         # 消息存储
         self.message_store = MessageStore(str(settings.message_db_path))
+        # 新消息入库时触发，供 getUpdates 长轮询等待
+        self.updates_event = asyncio.Event()
 
         # 确保运行时文件存在
         settings.ensure_runtime_files()
@@ -259,6 +261,11 @@ class CommandProcessor:
             )
         except Exception as exc:
             print(f"[Processor] Save message error: {exc}")
+            return
+
+        # 唤醒所有正在等待的长轮询请求 (set 后立即 clear，后续请求重新等待)
+        self.updates_event.set()
+        self.updates_event.clear()
 
     async def _push_to_webhook(self, msg: dict):
         """推送消息到 Webhook"""
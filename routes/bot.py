@@ -7,14 +7,19 @@ https://core.telegram.org/bots/api
 
 from __future__ import annotations
 
+import asyncio
 import shutil
 import tempfile
 import time
+from functools import lru_cache
 from pathlib import Path
-from typing import TYPE_CHECKING, Annotated, Any
+from typing import TYPE_CHECKING, Annotated, Any, BinaryIO
 
-from fastapi import APIRouter, File, Form, Query, UploadFile
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, File, Form, Query, Response, UploadFile
+import orjson
+from pydantic import BaseModel, ConfigDict, Field
+
+from json_response import ORJSONResponse
 
 if TYPE_CHECKING:
     from direct_bot import WeChatHelperBot
@@ -22,6 +27,9 @@ if TYPE_CHECKING:
 
 router = APIRouter(prefix="/bot", tags=["Telegram Bot API"])
 
+# getUpdates 长轮询最长等待秒数 (与 Telegram 上限一致)
+_MAX_POLL_TIMEOUT = 50
+
 # 依赖注入的全局引用 (在 main.py 中设置)
 _bot: "WeChatHelperBot | None" = None
 _processor: "CommandProcessor | None" = None
@@ -46,31 +54,44 @@ def _get_processor() -> "CommandProcessor":
     return _processor
 
 
+def _save_upload(src: BinaryIO, suffix: str) -> str:
+    """将上传文件保存为临时文件并返回路径 (同步执行，应在线程池中调用)"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        # 1MB 块拷贝
+        shutil.copyfileobj(src, tmp, 1024 * 1024)
+        return tmp.name
+
+
 # === Pydantic Models ===
 
+# 请求体只读；chat_id / parse_mode 等未使用的 TG 参数不声明，传入时直接忽略
+_PAYLOAD_CONFIG = ConfigDict(extra="ignore", frozen=True)
+
+
 class SendMessagePayload(BaseModel):
     """sendMessage 请求体"""
+    model_config = _PAYLOAD_CONFIG
+
     text: str = Field(min_length=1)
-    chat_id: str | int | None = None
     reply_to_message_id: str | int | None = None
-    parse_mode: str | None = None
-    disable_notification: bool = False
 
 
 class SendDocumentPayload(BaseModel):
     """sendDocument 请求体 (JSON 模式)"""
+    model_config = _PAYLOAD_CONFIG
+
     document: str | None = None
     file_path: str | None = None
-    chat_id: str | int | None = None
     reply_to_message_id: str | int | None = None
     caption: str | None = None
 
 
 class SendPhotoPayload(BaseModel):
     """sendPhoto 请求体 (JSON 模式)"""
+    model_config = _PAYLOAD_CONFIG
+
     photo: str | None = None
     file_path: str | None = None
-    chat_id: str | int | None = None
     reply_to_message_id: str | int | None = None
     caption: str | None = None
 
@@ -84,27 +105,35 @@ class CopyMessagePayload(BaseModel):
 
 # === API Endpoints ===
 
-@router.get("/getUpdates")
+@router.get("/getUpdates", response_model=None)
 async def get_updates(
     offset: int = Query(default=0),
     limit: int = Query(default=100, ge=1, le=100),
     timeout: int = Query(default=0),
     allowed_updates: list[str] | None = Query(default=None),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     """https://core.telegram.org/bots/api#getupdates"""
     processor = _get_processor()
     updates = processor.get_updates(offset=offset, limit=limit)
-    return {"ok": True, "result": updates}
-
-
-@router.get("/getMe")
-async def get_me() -> dict[str, Any]:
-    """https://core.telegram.org/bots/api#getme"""
-    bot = _get_bot()
-    return {
+    if not updates and timeout > 0:
+        # 长轮询: 等待新消息入库或超时，避免客户端空转请求
+        try:
+            await asyncio.wait_for(processor.updates_event.wait(), timeout=min(timeout, _MAX_POLL_TIMEOUT))
+        except asyncio.TimeoutError:
+            pass
+        else:
+            updates = processor.get_updates(offset=offset, limit=limit)
+    # 高频轮询端点直接返回 ORJSONResponse，跳过 jsonable_encoder
+    return ORJSONResponse({"ok": True, "result": updates})
+
+
+@lru_cache(maxsize=8)
+def _get_me_body(uin: int) -> bytes:
+    """getMe 响应体 (仅依赖 uin，按 uin 缓存序列化结果)"""
+    return orjson.dumps({
         "ok": True,
         "result": {
-            "id": int(bot.uin) if bot.uin and bot.uin.isdigit() else 0,
+            "id": uin,
             "is_bot": True,
             "first_name": "文件传输助手",
             "username": "filehelper",
@@ -112,16 +141,37 @@ async def get_me() -> dict[str, Any]:
             "can_read_all_group_messages": False,
             "supports_inline_queries": False,
         },
-    }
+    })
+
+
+@lru_cache(maxsize=8)
+def _get_chat_body(uin: int) -> bytes:
+    """getChat 响应体 (仅依赖 uin，按 uin 缓存序列化结果)"""
+    return orjson.dumps({
+        "ok": True,
+        "result": {
+            "id": uin,
+            "type": "private",
+            "first_name": "文件传输助手",
+            "username": "filehelper",
+        },
+    })
 
 
-@router.post("/sendMessage")
+@router.get("/getMe", response_model=None)
+async def get_me() -> Response:
+    """https://core.telegram.org/bots/api#getme"""
+    bot = _get_bot()
+    return Response(_get_me_body(bot.uin_int), media_type="application/json")
+
+
+@router.post("/sendMessage", response_model=None)
 async def send_message(payload: SendMessagePayload) -> dict[str, Any]:
     """https://core.telegram.org/bots/api#sendmessage"""
     bot = _get_bot()
     processor = _get_processor()
 
-    if not await bot.check_login_status(poll=False):
+    if not await bot.check_login_cached():
         return {"ok": False, "error_code": 401, "description": "Unauthorized"}
 
     reply_to = str(payload.reply_to_message_id) if payload.reply_to_message_id else None
@@ -132,13 +182,13 @@ async def send_message(payload: SendMessagePayload) -> dict[str, Any]:
     return result
 
 
-@router.post("/sendDocument")
+@router.post("/sendDocument", response_model=None)
 async def send_document_json(payload: SendDocumentPayload) -> dict[str, Any]:
     """https://core.telegram.org/bots/api#senddocument (JSON 模式)"""
     bot = _get_bot()
     processor = _get_processor()
 
-    if not await bot.check_login_status(poll=False):
+    if not await bot.check_login_cached():
         return {"ok": False, "error_code": 401, "description": "Unauthorized"}
 
     file_path = payload.document or payload.file_path
@@ -157,7 +207,7 @@ async def send_document_json(payload: SendDocumentPayload) -> dict[str, Any]:
     return result
 
 
-@router.post("/sendDocument/upload")
+@router.post("/sendDocument/upload", response_model=None)
 async def send_document_upload(
     document: UploadFile = File(...),
     chat_id: Annotated[str | None, Form()] = None,
@@ -168,14 +218,13 @@ async def send_document_upload(
     bot = _get_bot()
     processor = _get_processor()
 
-    if not await bot.check_login_status(poll=False):
+    if not await bot.check_login_cached():
         return {"ok": False, "error_code": 401, "description": "Unauthorized"}
 
     # 保存到临时文件
     suffix = Path(document.filename or "file").suffix
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        shutil.copyfileobj(document.file, tmp)
-        tmp_path = tmp.name
+    # 放到线程池，避免大文件阻塞事件循环
+    tmp_path = await asyncio.to_thread(_save_upload, document.file, suffix)
 
     try:
         result = await processor.send_document(
@@ -188,16 +237,16 @@ async def send_document_upload(
 
         return result
     finally:
-        Path(tmp_path).unlink(missing_ok=True)
+        await asyncio.to_thread(Path(tmp_path).unlink, True)
 
 
-@router.post("/sendPhoto")
+@router.post("/sendPhoto", response_model=None)
 async def send_photo_json(payload: SendPhotoPayload) -> dict[str, Any]:
     """https://core.telegram.org/bots/api#sendphoto (JSON 模式)"""
     bot = _get_bot()
     processor = _get_processor()
 
-    if not await bot.check_login_status(poll=False):
+    if not await bot.check_login_cached():
         return {"ok": False, "error_code": 401, "description": "Unauthorized"}
 
     file_path = payload.photo or payload.file_path
@@ -216,7 +265,7 @@ async def send_photo_json(payload: SendPhotoPayload) -> dict[str, Any]:
     return result
 
 
-@router.post("/sendPhoto/upload")
+@router.post("/sendPhoto/upload", response_model=None)
 async def send_photo_upload(
     photo: UploadFile = File(...),
     chat_id: Annotated[str | None, Form()] = None,
@@ -227,13 +276,12 @@ async def send_photo_upload(
     bot = _get_bot()
     processor = _get_processor()
 
-    if not await bot.check_login_status(poll=False):
+    if not await bot.check_login_cached():
         return {"ok": False, "error_code": 401, "description": "Unauthorized"}
 
     suffix = Path(photo.filename or "photo.jpg").suffix or ".jpg"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        shutil.copyfileobj(photo.file, tmp)
-        tmp_path = tmp.name
+    # 放到线程池，避免大文件阻塞事件循环
+    tmp_path = await asyncio.to_thread(_save_upload, photo.file, suffix)
 
     try:
         result = await processor.send_document(
@@ -246,16 +294,16 @@ async def send_photo_upload(
 
         return result
     finally:
-        Path(tmp_path).unlink(missing_ok=True)
+        await asyncio.to_thread(Path(tmp_path).unlink, True)
 
 
-@router.post("/copyMessage")
+@router.post("/copyMessage", response_model=None)
 async def copy_message(payload: CopyMessagePayload) -> dict[str, Any]:
     """https://core.telegram.org/bots/api#copymessage"""
     bot = _get_bot()
     processor = _get_processor()
 
-    if not await bot.check_login_status(poll=False):
+    if not await bot.check_login_cached():
         return {"ok": False, "error_code": 401, "description": "Unauthorized"}
 
     # 从存储中获取原消息
@@ -274,22 +322,14 @@ async def copy_message(payload: CopyMessagePayload) -> dict[str, Any]:
     return result
 
 
-@router.get("/getChat")
-async def get_chat(chat_id: str | int | None = Query(default=None)) -> dict[str, Any]:
+@router.get("/getChat", response_model=None)
+async def get_chat(chat_id: str | int | None = Query(default=None)) -> Response:
     """https://core.telegram.org/bots/api#getchat"""
     bot = _get_bot()
-    return {
-        "ok": True,
-        "result": {
-            "id": int(bot.uin) if bot.uin and bot.uin.isdigit() else 0,
-            "type": "private",
-            "first_name": "文件传输助手",
-            "username": "filehelper",
-        },
-    }
+    return Response(_get_chat_body(bot.uin_int), media_type="application/json")
 
 
-@router.get("/getFile")
+@router.get("/getFile", response_model=None)
 async def get_file(file_id: str = Query(...)) -> dict[str, Any]:
     """https://core.telegram.org/bots/api#getfile"""
     processor = _get_processor()
@@ -309,7 +349,7 @@ async def get_file(file_id: str = Query(...)) -> dict[str, Any]:
     }
 
 
-@router.post("/setWebhook")
+@router.post("/setWebhook", response_model=None)
 async def set_webhook(
     url: str = "",
     certificate: str | None = None,
@@ -325,7 +365,7 @@ async def set_webhook(
     return {"ok": True, "result": True, "description": "Webhook was set"}
 
 
-@router.post("/deleteWebhook")
+@router.post("/deleteWebhook", response_model=None)
 async def delete_webhook(drop_pending_updates: bool = False) -> dict[str, Any]:
     """https://core.telegram.org/bots/api#deletewebhook"""
     processor = _get_processor()
@@ -333,12 +373,12 @@ async def delete_webhook(drop_pending_updates: bool = False) -> dict[str, Any]:
     return {"ok": True, "result": True}
 
 
-@router.get("/getWebhookInfo")
-async def get_webhook_info() -> dict[str, Any]:
+@router.get("/getWebhookInfo", response_model=None)
+async def get_webhook_info() -> ORJSONResponse:
     """https://core.telegram.org/bots/api#getwebhookinfo"""
     processor = _get_processor()
     url = processor.message_webhook_url
-    return {
+    return ORJSONResponse({
         "ok": True,
         "result": {
             "url": url,
@@ -347,4 +387,4 @@ async def get_webhook_info() -> dict[str, Any]:
             "max_connections": 40,
             "ip_address": None,
         },
-    }
+    })
@@ -8,15 +8,17 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
 import time
-from dataclasses import asdict
+from operator import itemgetter
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Iterator
 
 from fastapi import APIRouter, HTTPException, Query
 
 from config import settings
+from json_response import ORJSONResponse
 
 if TYPE_CHECKING:
     from processor import CommandProcessor
@@ -26,10 +28,14 @@ router = APIRouter(tags=["Files"])
 # 依赖注入
 _processor: "CommandProcessor | None" = None
 
-# 下载目录缓存
-_downloads_cache: dict[str, list[dict]] | None = None
-_downloads_cache_time: float = 0
+# 下载目录缓存 (按 include_subdirs 分别缓存，列式存储: 名称/相对路径/大小/修改时间)
+_DownloadsIndex = tuple[tuple[str, ...], tuple[str, ...], tuple[int, ...], tuple[float, ...]]
+_downloads_cache: dict[bool, tuple[float, _DownloadsIndex]] = {}
 _downloads_cache_ttl: float = 10.0
+# 失效计数: 扫描期间发生失效则丢弃该次结果
+_downloads_cache_gen = 0
+# 合并并发的冷缓存扫描
+_scan_lock = asyncio.Lock()
 
 
 def init(processor: "CommandProcessor"):
@@ -44,101 +50,117 @@ def _get_processor() -> "CommandProcessor":
     return _processor
 
 
-def _scan_downloads(include_subdirs: bool = True) -> list[dict]:
-    """扫描下载目录 (带缓存)"""
-    global _downloads_cache, _downloads_cache_time
-
-    cache_key = f"subdirs_{include_subdirs}"
-    now = time.time()
-
-    if _downloads_cache is not None and cache_key in _downloads_cache:
-        if (now - _downloads_cache_time) < _downloads_cache_ttl:
-            return _downloads_cache[cache_key]
-
-    files = []
-    download_dir = settings.download_dir
-
-    if include_subdirs:
-        for root, _, filenames in os.walk(download_dir):
-            root_path = Path(root)
-            for name in filenames:
-                if name.startswith("."):
-                    continue
-                file_path = root_path / name
-                try:
-                    stat_info = file_path.stat()
-                    rel_path = file_path.relative_to(download_dir)
-                    files.append({
-                        "name": name,
-                        "path": str(rel_path),
-                        "size": stat_info.st_size,
-                        "modified": stat_info.st_mtime,
-                    })
-                except OSError:
-                    continue
-    else:
+def _iter_download_files(include_subdirs: bool) -> Iterator[tuple[str, str, int, float]]:
+    """遍历下载目录，产出 (名称, 相对路径, 大小, 修改时间)"""
+    base = os.fspath(settings.download_dir)
+    prefix_len = len(os.path.join(base, ""))
+    stack = [base]
+    while stack:
         try:
-            with os.scandir(download_dir) as entries:
+            with os.scandir(stack.pop()) as entries:
                 for entry in entries:
-                    if entry.is_file() and not entry.name.startswith("."):
-                        try:
-                            stat_info = entry.stat()
-                            files.append({
-                                "name": entry.name,
-                                "path": entry.name,
-                                "size": stat_info.st_size,
-                                "modified": stat_info.st_mtime,
-                            })
-                        except OSError:
+                    if entry.is_dir(follow_symlinks=False):
+                        if include_subdirs:
+                            stack.append(entry.path)
+                        continue
+                    if entry.name.startswith("."):
+                        continue
+                    try:
+                        if not entry.is_file():
                             continue
+                        stat_info = entry.stat()
+                    except OSError:
+                        continue
+                    yield entry.name, entry.path[prefix_len:], stat_info.st_size, stat_info.st_mtime
         except OSError:
-            pass
+            continue
 
-    files.sort(key=lambda x: x["modified"], reverse=True)
 
-    if _downloads_cache is None:
-        _downloads_cache = {}
-    _downloads_cache[cache_key] = files
-    _downloads_cache_time = now
+def _scan_downloads(include_subdirs: bool = True) -> _DownloadsIndex:
+    """扫描下载目录 (按修改时间倒序，同步执行，应在线程池中调用)"""
+    rows = list(_iter_download_files(include_subdirs))
+    rows.sort(key=itemgetter(3), reverse=True)
+    return tuple(zip(*rows)) if rows else ((), (), (), ())
 
-    return files
+
+async def _refresh_downloads(include_subdirs: bool) -> _DownloadsIndex:
+    """在线程池中重新扫描并写入缓存"""
+    gen = _downloads_cache_gen
+    now = time.time()
+    index = await asyncio.to_thread(_scan_downloads, include_subdirs)
+    if gen == _downloads_cache_gen:
+        _downloads_cache[include_subdirs] = (now, index)
+    return index
+
+
+async def _get_downloads(include_subdirs: bool) -> _DownloadsIndex:
+    """获取下载目录索引 (缓存命中直接返回，冷缓存时只扫描一次)"""
+    cached = _downloads_cache.get(include_subdirs)
+    if cached is not None and (time.time() - cached[0]) < _downloads_cache_ttl:
+        return cached[1]
+
+    async with _scan_lock:
+        # 等锁期间可能已被其他请求刷新
+        cached = _downloads_cache.get(include_subdirs)
+        if cached is not None and (time.time() - cached[0]) < _downloads_cache_ttl:
+            return cached[1]
+        return await _refresh_downloads(include_subdirs)
+
+
+async def downloads_refresher(interval: float = _downloads_cache_ttl / 2) -> None:
+    """后台定期刷新已被请求过的下载目录缓存，使 /downloads 始终命中缓存"""
+    while True:
+        await asyncio.sleep(interval)
+        for include_subdirs in list(_downloads_cache):
+            try:
+                async with _scan_lock:
+                    await _refresh_downloads(include_subdirs)
+            except Exception as exc:
+                print(f"[Files] Downloads refresh error: {exc}")
 
 
 def invalidate_downloads_cache():
     """使下载目录缓存失效"""
-    global _downloads_cache
-    _downloads_cache = None
+    global _downloads_cache_gen
+    _downloads_cache_gen += 1
+    _downloads_cache.clear()
 
 
-@router.get("/downloads")
+@router.get("/downloads", response_model=None)
 async def list_downloads(
     limit: int = Query(default=100, ge=1, le=1000),
     include_subdirs: bool = Query(default=True),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     """列出下载的文件"""
-    files = _scan_downloads(include_subdirs)
-    return {
-        "files": files[:limit],
-        "total": len(files),
+    names, paths, sizes, mtimes = await _get_downloads(include_subdirs)
+    # 只为返回的前 limit 条构造字典
+    files = [
+        {"name": name, "path": path, "size": size, "modified": modified}
+        for name, path, size, modified in zip(names[:limit], paths[:limit], sizes[:limit], mtimes[:limit])
+    ]
+    return ORJSONResponse({
+        "files": files,
+        "total": len(names),
         "base_url": "/static/",
-    }
+    })
 
 
-@router.get("/files/metadata")
+@router.get("/files/metadata", response_model=None)
 async def get_files_metadata(
     limit: int = Query(default=100, ge=1, le=1000),
     offset: int = Query(default=0, ge=0),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     """获取文件元数据 (从数据库)"""
     processor = _get_processor()
     files = processor.message_store.get_files(limit=limit, offset=offset)
-    return {
-        "files": [asdict(f) for f in files],
+    # orjson 原生序列化 dataclass，无需 asdict 逐个转换
+    return ORJSONResponse({
+        "files": files,
         "count": len(files),
-    }
+    })
 
 
-@router.delete("/files/{msg_id}")
+@router.delete("/files/{msg_id}", response_model=None)
 async def delete_file(msg_id: str) -> dict[str, str]:
     """删除文件"""
     processor = _get_processor()
@@ -148,9 +170,8 @@ async def delete_file(msg_id: str) -> dict[str, str]:
         raise HTTPException(status_code=404, detail="File not found")
 
     try:
-        path = Path(file_info.file_path)
-        if path.exists():
-            path.unlink()
+        # 单次 unlink (不存在时忽略)，放到线程池避免阻塞事件循环
+        await asyncio.to_thread(Path(file_info.file_path).unlink, True)
         invalidate_downloads_cache()
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Delete failed: {exc}")
@@ -158,7 +179,7 @@ async def delete_file(msg_id: str) -> dict[str, str]:
     return {"status": "deleted", "msg_id": msg_id}
 
 
-@router.post("/files/cleanup")
+@router.post("/files/cleanup", response_model=None)
 async def cleanup_files(days: int = Query(default=30, ge=1)) -> dict[str, int]:
     """清理过期文件"""
     processor = _get_processor()
@@ -171,20 +192,20 @@ async def cleanup_files(days: int = Query(default=30, ge=1)) -> dict[str, int]:
     }
 
 
-@router.get("/store/stats")
+@router.get("/store/stats", response_model=None)
 async def store_stats() -> dict[str, Any]:
     """获取消息存储统计"""
     processor = _get_processor()
     return processor.message_store.get_stats()
 
 
-@router.get("/store/messages")
+@router.get("/store/messages", response_model=None)
 async def store_messages(
     limit: int = Query(default=50, ge=1, le=1000),
     offset: int = Query(default=0, ge=0),
     msg_type: str | None = Query(default=None),
     since: int | None = Query(default=None, description="Unix timestamp"),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     """查询历史消息"""
     processor = _get_processor()
     messages = processor.message_store.get_updates(
@@ -193,7 +214,8 @@ async def store_messages(
         msg_type=msg_type,
         since=since,
     )
-    return {
-        "messages": [asdict(m) for m in messages],
+    # orjson 原生序列化 dataclass，无需 asdict 逐个转换
+    return ORJSONResponse({
+        "messages": messages,
         "count": len(messages),
-    }
+    })
@@ -37,7 +37,7 @@ def _get_bot() -> "WeChatHelperBot":
 # - GET /webui -> Web 管理界面
 
 
-@router.post("/session/save")
+@router.post("/session/save", response_model=None)
 async def save_session() -> dict[str, bool]:
     """保存会话"""
     bot = _get_bot()
@@ -45,14 +45,14 @@ async def save_session() -> dict[str, bool]:
     return {"ok": success}
 
 
-@router.get("/trace/status")
+@router.get("/trace/status", response_model=None)
 async def trace_status() -> dict[str, Any]:
     """Trace 状态"""
     bot = _get_bot()
     return bot.get_trace_status()
 
 
-@router.get("/trace/recent")
+@router.get("/trace/recent", response_model=None)
 async def trace_recent(limit: int = Query(default=100, ge=1, le=1000)) -> dict[str, Any]:
     """最近的 Trace 记录"""
     bot = _get_bot()
@@ -60,7 +60,7 @@ async def trace_recent(limit: int = Query(default=100, ge=1, le=1000)) -> dict[s
     return {"count": len(rows), "rows": rows}
 
 
-@router.post("/trace/clear")
+@router.post("/trace/clear", response_model=None)
 async def trace_clear() -> dict[str, str]:
     """清除 Trace 日志"""
     bot = _get_bot()